@@ -1,17 +1,355 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
 import os
-from dotenv import load_dotenv
+import random
+import re
+import threading
+import time
+from collections import deque
+from backend.cache import LRUCache
+from backend.database import (
+    get_cached_response, get_cached_embeddings, store_cached_response,
+    count_cached_responses, clear_cached_responses, record_cached_response_hits,
+)
+from backend.nudges import LOW_SAVING_RATE, HIGH_SAVING_RATE
 
-load_dotenv()
+MODEL_NAME = "gemini-2.5-flash"
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+_model = None
+_model_lock = threading.Lock()
 
-model = genai.GenerativeModel("gemini-2.5-flash")
+def get_model():
+    """The shared Gemini model, created on first use.
 
+    Importing google.generativeai and configuring the client is slow, so it
+    happens on the first question rather than whenever a page imports this module.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                from dotenv import load_dotenv
 
-def get_financial_advice(prompt):
+                load_dotenv()
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+
+ERROR_PREFIX = "Error generating advice:"
+
+
+def get_financial_advice(prompt, client=None):
+    started = time.perf_counter()
+    try:
+        response = (client or get_model()).generate_content(prompt)
+        text = response.text
+    except Exception as e:
+        _record_latency("blocking", started, None, False)
+        return f"{ERROR_PREFIX} {e}"
+    _record_latency("blocking", started, time.perf_counter(), True)
+    return text
+
+
+# ── Latency Metrics ───────────────────────────────────
+# Every call records time-to-first-token and total latency (seconds) so the
+# streaming and async paths can be compared against the blocking one.
+
+LATENCY_WINDOW = 500
+_latencies = deque(maxlen=LATENCY_WINDOW)
+_latency_lock = threading.Lock()
+
+def _record_latency(path, started, first_token_at, ok):
+    finished = time.perf_counter()
+    with _latency_lock:
+        _latencies.append({
+            "path": path,
+            "ttft": None if first_token_at is None else first_token_at - started,
+            "total": finished - started,
+            "ok": ok,
+        })
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def get_latency_stats(path=None):
+    """P50/P95 time-to-first-token and total latency over the recent calls."""
+    with _latency_lock:
+        records = [r for r in _latencies if path is None or r["path"] == path]
+    ttft = [r["ttft"] for r in records if r["ttft"] is not None]
+    total = [r["total"] for r in records]
+    return {
+        "calls": len(records),
+        "errors": sum(not r["ok"] for r in records),
+        "ttft_p50": _percentile(ttft, 50),
+        "ttft_p95": _percentile(ttft, 95),
+        "total_p50": _percentile(total, 50),
+        "total_p95": _percentile(total, 95),
+    }
+
+
+# ── Streaming ─────────────────────────────────────────
+
+def _chunk_text(chunk):
+    # Chunks without text (e.g. a safety block) raise on .text; skip them
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return chunk.text
+    except Exception:
+        return ""
+
+def stream_financial_advice(prompt, client=None, raise_errors=False):
+    """Yield the answer piece by piece as Gemini produces it.
+
+    `client` defaults to the shared model; anything with a compatible
+    generate_content(prompt, stream=True) works, which is how a local stub is
+    plugged in. Errors are yielded as text, like get_financial_advice(), or
+    re-raised with raise_errors so the caller can tell a partial answer from
+    a complete one.
+    """
+    client = client or get_model()
+    started, first_token_at, ok = time.perf_counter(), None, True
+    try:
+        for chunk in client.generate_content(prompt, stream=True):
+            text = _chunk_text(chunk)
+            if text:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield text
     except Exception as e:
-        return f"Error generating advice: {e}"
+        ok = False
+        if raise_errors:
+            raise
+        yield f"{ERROR_PREFIX} {e}"
+    finally:
+        _record_latency("stream", started, first_token_at, ok)
+
+
+# ── Async Client ──────────────────────────────────────
+
+class AsyncAdviceClient:
+    """asyncio client with per-attempt timeouts, retries with backoff and a concurrency cap.
+
+    Uses the model's generate_content_async() when it has one and otherwise
+    runs the blocking call in a worker thread, so a plain stub works as well.
+    """
+
+    def __init__(self, client=None, timeout=30.0, max_retries=2, backoff=0.5, max_concurrency=4):
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _sleep_before_retry(self, attempt):
+        # Exponential backoff with jitter so retries from many sessions spread out
+        await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def _chunks(self, prompt):
+        client = self.client or await asyncio.to_thread(get_model)
+        if hasattr(client, "generate_content_async"):
+            response = await client.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                yield chunk
+        else:
+            chunks = await asyncio.to_thread(lambda: list(client.generate_content(prompt, stream=True)))
+            for chunk in chunks:
+                yield chunk
+
+    async def stream(self, prompt):
+        """Async generator of answer pieces.
+
+        The timeout applies to the wait for every piece. Failures before the
+        first piece are retried; once text has been yielded a failure ends the
+        stream with an error message instead of repeating the answer.
+        """
+        async with self._semaphore:
+            started, first_token_at = time.perf_counter(), None
+            for attempt in range(self.max_retries + 1):
+                chunks = self._chunks(prompt)
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            raise TimeoutError(f"no reply within {self.timeout:g}s") from None
+                        text = _chunk_text(chunk)
+                        if text:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                            yield text
+                    _record_latency("async", started, first_token_at, True)
+                    return
+                except Exception as e:
+                    error = e
+                    if first_token_at is not None or attempt == self.max_retries:
+                        break
+                    await self._sleep_before_retry(attempt)
+                finally:
+                    await chunks.aclose()
+            _record_latency("async", started, first_token_at, False)
+            yield f"{ERROR_PREFIX} {error}"
+
+    async def advise(self, prompt):
+        """The full answer as one string."""
+        return "".join([piece async for piece in self.stream(prompt)])
+
+    async def advise_many(self, prompts):
+        """Answer several prompts concurrently, at most max_concurrency at a time."""
+        return await asyncio.gather(*(self.advise(prompt) for prompt in prompts))
+
+
+# ── Response Cache ────────────────────────────────────
+# Answers are shared between users whose profiles fall in the same bucket
+# (level + saving-rate band), keyed on the normalized question. A small
+# in-process LRU sits in front of the SQLite table so repeats skip the
+# database too; the table keeps answers across restarts. Answers that are
+# cached must come from a prompt holding only the bucket, never one user's
+# own numbers (see is_cacheable_question). Hits served from memory are
+# written back to the table in batches, so trimming by last use still keeps
+# the most popular answers.
+
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_MAX_ENTRIES = 5000
+RESPONSE_MEMORY_CACHE_SIZE = 1024
+SIMILARITY_THRESHOLD = 0.92
+HIT_FLUSH_INTERVAL = 30.0   # seconds between writes of in-memory hits to SQLite
+HIT_FLUSH_SIZE = 256        # ...or sooner once this many entries have pending hits
+
+_response_memory = LRUCache(maxsize=RESPONSE_MEMORY_CACHE_SIZE)
+_response_stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+_response_stats_lock = threading.Lock()
+_similarity = {"embed": None, "threshold": SIMILARITY_THRESHOLD}
+_pending_hits = {}          # cache_key -> [hits, last_used_at] not yet written to SQLite
+_pending_hits_lock = threading.Lock()
+_last_hit_flush = time.time()
+
+# Questions about the asker's own records need their real numbers in the prompt
+_PERSONAL_QUESTION = re.compile(
+    r"\b(my|mine)\b.*\b(income|expenses?|spending|savings?|balance|streak|xp|badges?|level|data|transactions?|progress)\b"
+)
+
+def _count(stat):
+    with _response_stats_lock:
+        _response_stats[stat] += 1
+
+def _note_memory_hit(key, now):
+    with _pending_hits_lock:
+        entry = _pending_hits.setdefault(key, [0, now])
+        entry[0] += 1
+        entry[1] = now
+        due = len(_pending_hits) >= HIT_FLUSH_SIZE or now - _last_hit_flush >= HIT_FLUSH_INTERVAL
+    if due:
+        flush_cache_hits()
+
+def flush_cache_hits():
+    """Write hits served from the in-process LRU to the SQLite table."""
+    global _last_hit_flush
+    with _pending_hits_lock:
+        pending = [(hits, used_at, key) for key, (hits, used_at) in _pending_hits.items()]
+        _pending_hits.clear()
+        _last_hit_flush = time.time()
+    if pending:
+        record_cached_response_hits(pending)
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s₹%]", " ", question.lower()).split())
+
+def is_cacheable_question(question):
+    return not _PERSONAL_QUESTION.search(normalize_question(question))
+
+def saving_rate_band(income, expense):
+    if income <= 0:
+        return "no-income"
+    rate = (income - expense) / income * 100
+    if rate < LOW_SAVING_RATE:
+        return "low"
+    if rate >= HIGH_SAVING_RATE:
+        return "high"
+    return "medium"
+
+def profile_bucket(level, income, expense):
+    return f"L{level}|{saving_rate_band(income, expense)}"
+
+def _cache_key(question, bucket):
+    return hashlib.sha1(f"{bucket}\x1f{normalize_question(question)}".encode()).hexdigest()
+
+def set_embedding_function(embed, threshold=SIMILARITY_THRESHOLD):
+    """Enable paraphrase lookups. `embed(text)` returns a 1-D vector; None disables them."""
+    _similarity["embed"] = embed
+    _similarity["threshold"] = threshold
+
+def _embedding_of(question):
+    import numpy as np
+
+    vector = np.asarray(_similarity["embed"](normalize_question(question)), dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+def _similar_response(question, bucket, min_created_at):
+    import numpy as np
+
+    candidates = get_cached_embeddings(bucket, min_created_at)
+    if not candidates:
+        return None
+    matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in candidates])
+    scores = matrix @ _embedding_of(question)
+    best = int(np.argmax(scores))
+    return candidates[best][:2] if scores[best] >= _similarity["threshold"] else None
+
+def get_cached_advice(question, bucket):
+    """A cached answer for this question and profile bucket, or None."""
+    key = _cache_key(question, bucket)
+    now = time.time()
+    min_created_at = now - RESPONSE_CACHE_TTL
+    entry = _response_memory.get(key)
+    if entry is not None and entry[1] >= min_created_at:
+        _count("exact_hits")
+        _note_memory_hit(key, now)
+        return entry[0]
+
+    entry = get_cached_response(key, min_created_at)
+    if entry is not None:
+        _count("exact_hits")
+    elif _similarity["embed"] is not None:
+        entry = _similar_response(question, bucket, min_created_at)
+        if entry is not None:
+            _count("similar_hits")
+    if entry is None:
+        _count("misses")
+        return None
+    _response_memory.set(key, entry)
+    return entry[0]
+
+def cache_advice(question, bucket, response):
+    """Remember an answer. Error replies are never cached, and neither may a
+    streamed answer that broke off partway (check Ticket.failed first)."""
+    if not response or response.startswith(ERROR_PREFIX):
+        return
+    key = _cache_key(question, bucket)
+    now = time.time()
+    embedding = _embedding_of(question).tobytes() if _similarity["embed"] is not None else None
+    # Storing trims by last use, so bring the table up to date with memory hits first
+    flush_cache_hits()
+    store_cached_response(key, bucket, normalize_question(question), response, embedding,
+                          min_created_at=now - RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+    _response_memory.set(key, (response, now))
+
+def clear_response_cache():
+    _response_memory.clear()
+    with _pending_hits_lock:
+        _pending_hits.clear()
+    clear_cached_responses()
+
+def get_response_cache_stats():
+    with _response_stats_lock:
+        stats = dict(_response_stats)
+    lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["exact_hits"] + stats["similar_hits"]) / lookups if lookups else 0.0
+    stats["stored"] = count_cached_responses()
+    return stats
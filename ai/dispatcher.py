@@ -0,0 +1,260 @@
+"""
+Dispatcher — Shared, rate-limited queue in front of the AI coach.
+
+Every session submits its prompt here instead of calling Gemini directly. A
+bounded worker pool makes the upstream calls, a token bucket keeps them under
+the API rate limit, and identical prompts that are already queued or running
+share one call: every waiter streams from the same chunk buffer. Tickets carry
+the queue position and an estimated wait so the page can tell the student.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.chatbot import ERROR_PREFIX, stream_financial_advice
+
+MAX_WORKERS = 4
+MAX_QUEUED = 64
+REQUESTS_PER_MINUTE = 60
+BURST = 10
+INITIAL_SERVICE_ESTIMATE = 3.0   # seconds per call until real ones are measured
+
+
+class DispatcherBusy(RuntimeError):
+    """Raised when the queue is full; `estimated_wait` says when to try again."""
+
+    def __init__(self, estimated_wait):
+        super().__init__(f"AI coach is busy, try again in about {estimated_wait:.0f}s")
+        self.estimated_wait = estimated_wait
+
+
+# ── Rate Limiting ─────────────────────────────────────
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, tokens=1):
+        """Seconds until `tokens` would be available (0 if they are now)."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# ── Shared Calls ──────────────────────────────────────
+
+class _Flight:
+    """One upstream call and the chunk buffer every coalesced waiter reads from."""
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self.waiters = 1
+        self.started_at = None
+        self._cond = threading.Condition()
+
+    def append(self, text):
+        with self._cond:
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def fail(self, text):
+        """End the answer with an error message; the flight counts as failed."""
+        with self._cond:
+            self.failed = True
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def stream(self, timeout=None):
+        """Yield every chunk from the start, then new ones as they arrive."""
+        index = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while index == len(self.chunks) and not self.done:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("timed out waiting for the AI coach")
+                    self._cond.wait(remaining)
+                pending = self.chunks[index:]
+                finished = self.done
+            yield from pending
+            index += len(pending)
+            if finished and index == len(self.chunks):
+                return
+
+
+class Ticket:
+    """A caller's handle on a (possibly shared) call.
+
+    `position` is how many calls were ahead in the queue at submission
+    (0 = started straight away), `coalesced` whether an identical prompt was
+    already in flight, and `estimated_wait` the expected seconds until the
+    first text. `failed` is set once the call has broken off with an error,
+    so a partial answer is never mistaken for a complete one.
+    """
+
+    def __init__(self, flight, coalesced, position, estimated_wait):
+        self._flight = flight
+        self.coalesced = coalesced
+        self.position = position
+        self.estimated_wait = estimated_wait
+
+    @property
+    def failed(self):
+        return self._flight.failed
+
+    def stream(self, timeout=None):
+        return self._flight.stream(timeout)
+
+    def result(self, timeout=None):
+        return "".join(self._flight.stream(timeout))
+
+
+# ── Dispatcher ────────────────────────────────────────
+
+class AdviceDispatcher:
+    """Bounded pool + token bucket + in-flight coalescing around the coach model.
+
+    `client` is handed to stream_financial_advice(), so a local stub model can
+    stand in for Gemini.
+    """
+
+    def __init__(self, client=None, max_workers=MAX_WORKERS, max_queued=MAX_QUEUED,
+                 requests_per_minute=REQUESTS_PER_MINUTE, burst=BURST):
+        self.client = client
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="advice")
+        self._lock = threading.Lock()
+        self._in_flight = {}            # prompt -> _Flight, queued or running
+        self._queued = OrderedDict()    # flights not yet started, in submission order
+        self._service_time = INITIAL_SERVICE_ESTIMATE
+        self._stats = {"submitted": 0, "coalesced": 0, "upstream_calls": 0, "rejected": 0, "rate_limited_s": 0.0}
+
+    def _estimate_wait(self, ahead):
+        # Called under self._lock. Once the calls running plus the `ahead`
+        # queued ones fill the pool, each further max_workers of them costs
+        # one service time. The bucket also needs a token for each of them
+        # and for us; whichever is slower sets the wait.
+        busy = len(self._in_flight) - len(self._queued) + ahead
+        pool_wait = 0.0
+        if busy >= self.max_workers:
+            pool_wait = ((busy - self.max_workers) // self.max_workers + 1) * self._service_time
+        return max(pool_wait, self._bucket.wait_time(ahead + 1))
+
+    def submit(self, prompt):
+        """Queue a prompt (or join an identical one in flight). Returns a Ticket."""
+        with self._lock:
+            self._stats["submitted"] += 1
+            flight = self._in_flight.get(prompt)
+            if flight is not None:
+                flight.waiters += 1
+                self._stats["coalesced"] += 1
+                ahead = list(self._queued).index(prompt) if prompt in self._queued else 0
+                wait = self._estimate_wait(ahead) if flight.started_at is None else 0.0
+                return Ticket(flight, True, ahead, wait)
+
+            ahead = len(self._queued)
+            if ahead >= self.max_queued:
+                self._stats["rejected"] += 1
+                raise DispatcherBusy(self._estimate_wait(ahead))
+
+            flight = _Flight(prompt)
+            self._in_flight[prompt] = flight
+            self._queued[prompt] = flight
+            wait = self._estimate_wait(ahead)
+        self._executor.submit(self._run, flight)
+        return Ticket(flight, False, ahead, wait)
+
+    def _run(self, flight):
+        with self._lock:
+            self._queued.pop(flight.prompt, None)
+        waited = self._bucket.acquire()
+        started = time.monotonic()
+        flight.started_at = started
+        try:
+            for text in stream_financial_advice(flight.prompt, client=self.client, raise_errors=True):
+                flight.append(text)
+        except Exception as e:
+            flight.fail(f"{ERROR_PREFIX} {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(flight.prompt, None)
+                self._stats["upstream_calls"] += 1
+                self._stats["rate_limited_s"] += waited
+                # Smoothed per-call service time feeds the wait estimates
+                self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            flight.finish()
+
+    def stream(self, prompt, timeout=None):
+        return self.submit(prompt).stream(timeout)
+
+    def ask(self, prompt, timeout=None):
+        return self.submit(prompt).result(timeout)
+
+    def status(self):
+        """Queue depth, in-flight calls, estimated wait for a new prompt and running totals."""
+        with self._lock:
+            queued = len(self._queued)
+            running = len(self._in_flight) - queued
+            stats = dict(self._stats)
+            stats.update(
+                queued=queued,
+                running=running,
+                service_time_s=self._service_time,
+                estimated_wait_s=self._estimate_wait(queued),
+            )
+        submitted = stats["submitted"]
+        stats["coalesce_rate"] = stats["coalesced"] / submitted if submitted else 0.0
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """The process-wide dispatcher shared by every Streamlit session."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AdviceDispatcher()
+    return _dispatcher
@@ -0,0 +1,208 @@
+"""
+Prompt Builder — Token-budgeted prompts for the AI coach.
+
+A prompt is a compact persona, a cached profile summary, a rolling summary of
+older turns, the most recent turns verbatim and the question, trimmed so the
+whole thing stays within PROMPT_TOKEN_BUDGET however long the chat gets.
+"""
+
+import re
+import threading
+from collections import deque
+
+from backend.cache import LRUCache
+from backend.database import get_generation
+from backend.gamification import get_gamification_summary
+from backend.analytics import totals_by_type
+
+PROMPT_TOKEN_BUDGET = 1200
+RECENT_MESSAGES = 6          # three exchanges kept verbatim
+SUMMARY_TOKEN_BUDGET = 250
+QUESTION_TOKEN_LIMIT = 300
+MESSAGE_TOKEN_LIMIT = 200    # cap per verbatim message
+SUMMARY_LINE_TOKENS = 40
+
+PERSONA = (
+    "You are FinMentor, a friendly, motivating financial mentor for students. "
+    "Be clear, practical and concise, use a few emojis, and suggest concrete next steps."
+)
+INSTRUCTIONS = "Answer the latest question. Use the profile and earlier conversation when relevant."
+
+BAND_LABELS = {
+    "no-income": "no income logged yet",
+    "low": "below 10% (needs improvement)",
+    "medium": "between 10% and 30%",
+    "high": "30% or more (excellent)",
+}
+
+# ── Token Estimates ───────────────────────────────────
+# Roughly four characters per token for English text; close enough for
+# budgeting without shipping a tokenizer.
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+def truncate_to_tokens(text, max_tokens):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(max_tokens * 4 - 1, 0)]
+    return (cut.rsplit(" ", 1)[0] if " " in cut else cut) + "…"
+
+# ── Profile Summaries ─────────────────────────────────
+
+PROFILE_CACHE_SIZE = 2048
+_profile_cache = LRUCache(maxsize=PROFILE_CACHE_SIZE)
+
+def profile_summary(username):
+    """Compact profile lines for a user's own prompts.
+
+    Cached per user until their next write (see backend.database.bump_generation).
+    """
+    key = (username, get_generation(username))
+    summary = _profile_cache.get(key)
+    if summary is not None:
+        return summary
+
+    gamification = get_gamification_summary(username)
+    totals = totals_by_type(username)
+    income, expense = totals["Income"], totals["Expense"]
+    level = gamification["level"]
+    rate = f"{(income - expense) / income * 100:.1f}%" if income > 0 else "n/a"
+    summary = "\n".join([
+        f"- Level {level['level']} ({level['name']}), {level['total_xp']} XP, "
+        f"{gamification['badge_count']} badges",
+        f"- Saving streak: {gamification['streak']['current_streak']} days",
+        f"- Income ₹{income:,.0f}, expenses ₹{expense:,.0f}, "
+        f"net savings ₹{income - expense:,.0f}, saving rate {rate}",
+    ])
+    _profile_cache.set(key, summary)
+    return summary
+
+def bucket_profile_summary(level, level_name, band):
+    """Profile lines that identify only a profile bucket, for answers shared between users."""
+    return f"- Level {level} ({level_name})\n- Saving rate: {BAND_LABELS[band]}"
+
+# ── Conversation Memory ───────────────────────────────
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def _summary_line(role, text):
+    """First substantive sentence of a message (skipping openers like "Great question!"), as one short line."""
+    sentences = _SENTENCE_END.split(" ".join(text.split()))
+    first = next((s for s in sentences if len(s.split()) >= 5), sentences[0])
+    speaker = "Student" if role == "user" else "Coach"
+    return f"- {speaker}: {truncate_to_tokens(first, SUMMARY_LINE_TOKENS)}"
+
+class ConversationMemory:
+    """Rolling extractive summary of the turns older than the recent window.
+
+    Each update only folds the messages that have just left the window, and
+    the oldest summary lines are dropped once the summary exceeds its budget,
+    so the per-turn cost stays flat as the chat grows.
+    """
+
+    def __init__(self, recent_messages=RECENT_MESSAGES, summary_tokens=SUMMARY_TOKEN_BUDGET):
+        self.recent_messages = recent_messages
+        self.summary_tokens = summary_tokens
+        self.lines = deque()
+        self.tokens = 0
+        self.folded = 0
+
+    def update(self, messages):
+        """Fold messages that left the recent window; returns the recent ones."""
+        if len(messages) < self.folded:
+            # The chat was cleared; start over
+            self.__init__(self.recent_messages, self.summary_tokens)
+        cutoff = max(len(messages) - self.recent_messages, 0)
+        for role, text in messages[self.folded:cutoff]:
+            line = _summary_line(role, text)
+            self.lines.append(line)
+            self.tokens += estimate_tokens(line) + 1
+        self.folded = max(self.folded, cutoff)
+        while self.tokens > self.summary_tokens and self.lines:
+            self.tokens -= estimate_tokens(self.lines.popleft()) + 1
+        return messages[cutoff:]
+
+# ── Prompt Assembly ───────────────────────────────────
+
+PROMPT_METRICS_WINDOW = 500
+_prompt_metrics = deque(maxlen=PROMPT_METRICS_WINDOW)
+_metrics_lock = threading.Lock()
+
+def _fit_lines(lines, max_tokens):
+    """The newest lines (last in `lines`) that fit in max_tokens, in original order."""
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return kept[::-1]
+
+def build_prompt(question, profile, messages=(), memory=None, budget=PROMPT_TOKEN_BUDGET):
+    """Assemble a prompt within `budget` tokens. Returns (prompt, metrics).
+
+    `messages` is the (role, text) history before this question. With a
+    ConversationMemory, older turns come from its rolling summary; without
+    one, only the recent window is used.
+    """
+    question = truncate_to_tokens(question.strip(), QUESTION_TOKEN_LIMIT)
+    if memory is not None:
+        recent = memory.update(list(messages))
+        summary = list(memory.lines)
+    else:
+        recent = list(messages)[-RECENT_MESSAGES:]
+        summary = []
+
+    fixed = [PERSONA, f"Student profile:\n{profile}", f"Question:\n{question}", INSTRUCTIONS]
+    remaining = budget - sum(estimate_tokens(part) + 2 for part in fixed)
+
+    # Recent turns take priority over the summary of older ones
+    recent_lines = _fit_lines(
+        [f"{'Student' if role == 'user' else 'Coach'}: {truncate_to_tokens(text, MESSAGE_TOKEN_LIMIT)}"
+         for role, text in recent],
+        max(remaining - 8, 0),
+    )
+    remaining -= sum(estimate_tokens(line) + 1 for line in recent_lines) + 8
+    summary_lines = _fit_lines(summary, max(remaining - 8, 0))
+
+    parts = fixed[:2]
+    if summary_lines:
+        parts.append("Earlier in this chat:\n" + "\n".join(summary_lines))
+    if recent_lines:
+        parts.append("Recent conversation:\n" + "\n".join(recent_lines))
+    parts += fixed[2:]
+    prompt = "\n\n".join(parts)
+
+    metrics = {
+        "total_tokens": estimate_tokens(prompt),
+        "budget": budget,
+        "profile_tokens": estimate_tokens(profile),
+        "summary_tokens": sum(estimate_tokens(line) for line in summary_lines),
+        "recent_tokens": sum(estimate_tokens(line) for line in recent_lines),
+        "question_tokens": estimate_tokens(question),
+        "recent_messages": len(recent_lines),
+        "summary_lines": len(summary_lines),
+        "history_messages": len(messages),
+    }
+    with _metrics_lock:
+        _prompt_metrics.append(metrics)
+    return prompt, metrics
+
+def get_prompt_metrics(last=None):
+    """Per-turn metrics for the most recent prompts, oldest first."""
+    with _metrics_lock:
+        metrics = list(_prompt_metrics)
+    return metrics if last is None else metrics[-last:]
+
+def get_prompt_size_stats():
+    sizes = sorted(m["total_tokens"] for m in get_prompt_metrics())
+    if not sizes:
+        return {"prompts": 0, "p50_tokens": None, "p95_tokens": None, "max_tokens": None}
+    return {
+        "prompts": len(sizes),
+        "p50_tokens": sizes[len(sizes) // 2],
+        "p95_tokens": sizes[min(len(sizes) - 1, int(len(sizes) * 0.95))],
+        "max_tokens": sizes[-1],
+    }
@@ -1,6 +1,7 @@
 import streamlit as st
 from backend.database import create_tables, register_user, login_user
 from backend.gamification import get_gamification_summary
+from backend.events import start_worker
 
 st.set_page_config(
     page_title="FinMentor — Investment Coach for Students",
@@ -10,6 +11,7 @@ st.set_page_config(
 )
 
 create_tables()
+start_worker()  # applies streak/XP/badge updates queued by writes
 
 # ── Load Custom CSS ──
 st.markdown("""
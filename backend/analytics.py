@@ -0,0 +1,179 @@
+"""
+Analytics — Ledger computations shared by the dashboard, tracker and nudges.
+"""
+
+from datetime import datetime, timedelta
+
+from backend.database import get_connection, get_user_aggregates, _audited
+
+# pandas is imported inside the functions that build DataFrames, so pages
+# that only need totals (e.g. the AI coach) skip it.
+
+
+def _as_timestamp(value):
+    """Normalize a date/datetime/str bound to the ledger's 'YYYY-MM-DD HH:MM:SS' format."""
+    if isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def totals_by_type(username):
+    """All-time {"Income": total, "Expense": total}, read from the running aggregates."""
+    totals = get_user_aggregates(username)
+    return {"Income": totals["income"], "Expense": totals["expense"]}
+
+
+# ── Chart Data ────────────────────────────────────────
+# Charts read the daily/monthly rollups (see backend.database), so their cost
+# follows the number of periods and categories, not of transactions.
+
+_TOTALS_BY_CATEGORY_SQL = _audited("totals_by_category", """
+    SELECT type, category, SUM(amount) AS amount
+    FROM monthly_rollups
+    WHERE username=?
+    GROUP BY type, category
+""")
+
+_TOTALS_BY_CATEGORY_FOR_TYPE_SQL = _audited("totals_by_category_for_type", """
+    SELECT type, category, SUM(amount) AS amount
+    FROM monthly_rollups
+    WHERE username=? AND type=?
+    GROUP BY category
+""")
+
+def totals_by_category(username, t_type=None):
+    """Per-category totals as a DataFrame with Type, Category and Amount columns.
+
+    Pass t_type="Expense" or "Income" to restrict to one side of the ledger.
+    Summed from the monthly rollups.
+    """
+    import pandas as pd
+
+    with get_connection() as conn:
+        if t_type is None:
+            rows = conn.execute(_TOTALS_BY_CATEGORY_SQL, (username,)).fetchall()
+        else:
+            rows = conn.execute(_TOTALS_BY_CATEGORY_FOR_TYPE_SQL, (username, t_type)).fetchall()
+    return pd.DataFrame([tuple(row) for row in rows], columns=["Type", "Category", "Amount"])
+
+
+_DAILY_SAVINGS_TREND_SQL = _audited("daily_savings_trend", """
+    SELECT period,
+           SUM(CASE WHEN type='Income' THEN amount ELSE -amount END) AS net,
+           SUM(SUM(CASE WHEN type='Income' THEN amount ELSE -amount END))
+               OVER (ORDER BY period ROWS UNBOUNDED PRECEDING) AS cumulative
+    FROM daily_rollups
+    WHERE username=?
+    GROUP BY period
+    ORDER BY period
+""")
+
+def daily_savings_trend(username):
+    """Running savings balance at the end of each day with transactions.
+
+    Returns a DataFrame with Date, NetAmount and CumulativeSavings columns,
+    one row per day in date order, from the daily rollups.
+    """
+    import pandas as pd
+
+    with get_connection() as conn:
+        rows = conn.execute(_DAILY_SAVINGS_TREND_SQL, (username,)).fetchall()
+    df = pd.DataFrame([tuple(row) for row in rows], columns=["Date", "NetAmount", "CumulativeSavings"])
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+
+_MONTHLY_TOTALS_SQL = _audited("monthly_totals", """
+    SELECT period,
+           COALESCE(SUM(CASE WHEN type='Income' THEN amount END), 0) AS income,
+           COALESCE(SUM(CASE WHEN type='Expense' THEN amount END), 0) AS expense
+    FROM monthly_rollups
+    WHERE username=?
+    GROUP BY period
+    ORDER BY period DESC
+    LIMIT ?
+""")
+
+def monthly_totals(username, months=12):
+    """Income and expense per month for the latest `months` months with transactions, oldest first.
+
+    A DataFrame with Month ('YYYY-MM'), Income and Expense columns; months=None returns every month.
+    """
+    import pandas as pd
+
+    with get_connection() as conn:
+        rows = conn.execute(_MONTHLY_TOTALS_SQL, (username, -1 if months is None else months)).fetchall()
+    return pd.DataFrame([tuple(row) for row in reversed(rows)], columns=["Month", "Income", "Expense"])
+
+
+_WINDOW_TOTALS_SQL = _audited("window_totals", """
+    SELECT COALESCE(SUM(CASE WHEN type='Income' THEN amount END), 0) AS income,
+           COALESCE(SUM(CASE WHEN type='Expense' THEN amount END), 0) AS expense
+    FROM transactions
+    WHERE username=? AND date >= ? AND date < ?
+""")
+
+def window_totals(username, start, end):
+    """Income and expense totals for transactions dated in [start, end)."""
+    with get_connection() as conn:
+        row = conn.execute(
+            _WINDOW_TOTALS_SQL, (username, _as_timestamp(start), _as_timestamp(end))
+        ).fetchone()
+    return {"Income": row["income"], "Expense": row["expense"]}
+
+
+_WEEKLY_EXPENSES_SQL = _audited("weekly_expenses", """
+    SELECT COALESCE(SUM(CASE WHEN date >= :week_ago THEN amount END), 0) AS recent,
+           COALESCE(SUM(CASE WHEN date < :week_ago THEN amount END), 0) AS previous
+    FROM transactions
+    WHERE username=:username AND date >= :two_weeks_ago AND type='Expense'
+""")
+
+def weekly_expenses(username, now=None):
+    """Expense totals for the last 7 days and the 7 days before that.
+
+    Only the last two weeks of the (username, date) index are read, so the cost
+    does not grow with the length of the user's history.
+    """
+    now = now or datetime.now()
+    with get_connection() as conn:
+        row = conn.execute(_WEEKLY_EXPENSES_SQL, {
+            "username": username,
+            "week_ago": _as_timestamp(now - timedelta(days=7)),
+            "two_weeks_ago": _as_timestamp(now - timedelta(days=14)),
+        }).fetchone()
+    return row["recent"], row["previous"]
+
+
+_NUDGE_INPUTS_SQL = """
+    SELECT u.username,
+           COALESCE(s.current_streak, 0) AS current_streak,
+           s.last_saving_date,
+           COALESCE(a.txn_count, 0) AS txn_count,
+           COALESCE(a.income, 0) AS income,
+           COALESCE(a.expense, 0) AS expense,
+           COALESCE(w.recent, 0) AS recent_expenses,
+           COALESCE(w.previous, 0) AS previous_expenses
+    FROM users AS u
+    LEFT JOIN saving_streaks AS s ON s.username = u.username
+    LEFT JOIN user_aggregates AS a ON a.username = u.username
+    LEFT JOIN (
+        SELECT username,
+               SUM(CASE WHEN date >= :week_ago THEN amount END) AS recent,
+               SUM(CASE WHEN date < :week_ago THEN amount END) AS previous
+        FROM transactions
+        WHERE date >= :two_weeks_ago AND type='Expense'
+        GROUP BY username
+    ) AS w ON w.username = u.username
+"""
+
+def nudge_inputs_for_all_users(now=None):
+    """One row per user with every metric the nudge rules need, in a single query."""
+    import pandas as pd
+
+    now = now or datetime.now()
+    with get_connection() as conn:
+        return pd.read_sql_query(_NUDGE_INPUTS_SQL, conn, params={
+            "week_ago": _as_timestamp(now - timedelta(days=7)),
+            "two_weeks_ago": _as_timestamp(now - timedelta(days=14)),
+        })
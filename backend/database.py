@@ -1,71 +1,425 @@
 import sqlite3
 import hashlib
+import json
+import re
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+from backend.cache import LRUCache
+from backend.streaks import (
+    all_user_streaks, join_runs, make_run, saving_runs, shift_day, streak_state, to_day,
+)
+
 DB_NAME = "users.db"
 
-def get_connection():
-    conn = sqlite3.connect(DB_NAME)
+# ── Connection Pool ───────────────────────────────────
+
+POOL_SIZE = 8
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_pool_lock = threading.Lock()
+_pool_stats = {"opened": 0, "reused": 0, "closed": 0}
+_trace_hook = None
+
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers which database file it was opened on."""
+    db_name = None
+
+
+def _bump_pool_stat(name):
+    with _pool_lock:
+        _pool_stats[name] += 1
+
+
+def _open_connection():
+    conn = sqlite3.connect(
+        DB_NAME,
+        factory=_PooledConnection,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.db_name = DB_NAME
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    _bump_pool_stat("opened")
+    return conn
+
+
+def _close_connection(conn):
+    conn.close()
+    _bump_pool_stat("closed")
+
+
+def _acquire():
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            conn = _open_connection()
+            break
+        if conn.db_name == DB_NAME:
+            _bump_pool_stat("reused")
+            break
+        # DB_NAME was changed since this connection was pooled
+        _close_connection(conn)
+    conn.set_trace_callback(_trace_hook)
     return conn
 
+
+def _release(conn):
+    if conn.in_transaction:
+        conn.rollback()
+    if conn.db_name != DB_NAME:
+        _close_connection(conn)
+        return
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        _close_connection(conn)
+
+
+@contextmanager
+def get_connection():
+    """Borrow a long-lived connection from the pool for the duration of a with-block.
+
+    Connections stay open between calls (WAL mode, tuned pragmas and a per-connection
+    prepared-statement cache), so only the first use on a pool slot pays the open cost.
+    Anything left uncommitted when the block exits is rolled back.
+    """
+    conn = _acquire()
+    try:
+        yield conn
+    finally:
+        _release(conn)
+
+
+def close_all_connections():
+    """Close every idle pooled connection (e.g. before deleting or swapping DB_NAME)."""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            return
+        _close_connection(conn)
+
+
+@contextmanager
+def trace_statements():
+    """Collect the SQL of every statement run on pooled connections inside the block."""
+    global _trace_hook
+    statements = []
+    _trace_hook = statements.append
+    try:
+        yield statements
+    finally:
+        _trace_hook = None
+
+
+def get_pool_stats():
+    """Return connection churn counters: opened, reused, closed and currently idle."""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats["idle"] = _pool.qsize()
+    return stats
+
+# ── Write Generations ─────────────────────────────────
+# Every write that changes a user's gamification state bumps that user's
+# generation. Read caches key entries by (username, generation), so a write
+# makes older entries unreachable and they simply age out of the LRU.
+# Generations are per process; writes from another process are not seen.
+
+_generations = {}
+_generation_epoch = 0
+_generation_lock = threading.Lock()
+
+def bump_generation(username=None):
+    """Invalidate cached reads for one user, or for everyone when username is None."""
+    global _generation_epoch
+    with _generation_lock:
+        if username is None:
+            _generation_epoch += 1
+        else:
+            _generations[username] = _generations.get(username, 0) + 1
+
+def get_generation(username):
+    return (_generation_epoch, _generations.get(username, 0))
+
+# ── Query Registry ────────────────────────────────────
+
+AUDITED_QUERIES = {}
+_INDEX_SCAN_ALLOWED = set()
+
+def _audited(name, sql, index_scan_ok=False):
+    """Register a read query so audit_query_plans() checks it for table scans.
+
+    index_scan_ok marks queries that are global by design (e.g. leaderboards),
+    where walking an index in order is the expected plan.
+    """
+    AUDITED_QUERIES[name] = sql
+    if index_scan_ok:
+        _INDEX_SCAN_ALLOWED.add(name)
+    return sql
+
+# ── Schema ────────────────────────────────────────────
+
 def create_tables():
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT
-        )
-    """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE,
+                password TEXT
+            )
+        """)
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            amount REAL,
-            type TEXT,
-            category TEXT,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT,
+                amount REAL,
+                type TEXT,
+                category TEXT,
+                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS saving_streaks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            current_streak INTEGER DEFAULT 0,
-            longest_streak INTEGER DEFAULT 0,
-            last_saving_date TEXT,
-            total_xp INTEGER DEFAULT 0
-        )
-    """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS saving_streaks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE,
+                current_streak INTEGER DEFAULT 0,
+                longest_streak INTEGER DEFAULT 0,
+                last_saving_date TEXT,
+                total_xp INTEGER DEFAULT 0
+            )
+        """)
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS badges (
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS badges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT,
+                badge_name TEXT,
+                earned_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(username, badge_name)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_scores (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT,
+                topic TEXT,
+                score INTEGER,
+                total INTEGER,
+                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        conn.commit()
+
+    migrate()
+
+# ── Schema Migrations ─────────────────────────────────
+# Each step runs once, in order, inside its own transaction; the applied
+# version is tracked in PRAGMA user_version. Append new steps, never edit old ones.
+
+MIGRATIONS = [
+    (1, "Lookup indexes for per-user transaction, quiz and badge queries", (
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (username, date DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_type_amount ON transactions (username, type, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_quiz_scores_user_date ON quiz_scores (username, date DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_badges_user_earned ON badges (username, earned_date DESC)",
+    )),
+    (2, "Running per-user ledger totals, backfilled from transactions", (
+        """
+        CREATE TABLE IF NOT EXISTS user_aggregates (
+            username TEXT PRIMARY KEY,
+            income REAL NOT NULL DEFAULT 0,
+            expense REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            first_txn_date TIMESTAMP,
+            last_txn_date TIMESTAMP
+        )
+        """,
+        lambda cursor: _rebuild_aggregates(cursor),
+    )),
+    (3, "XP ranking index for leaderboards", (
+        "CREATE INDEX IF NOT EXISTS idx_saving_streaks_xp ON saving_streaks (total_xp DESC)",
+    )),
+    (4, "Covering index for per-type/per-category totals (supersedes the type/amount index)", (
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_type_category ON transactions (username, type, category, amount)",
+        "DROP INDEX IF EXISTS idx_transactions_user_type_amount",
+    )),
+    (5, "Precomputed nudges table and a date index for all-user window queries", (
+        """
+        CREATE TABLE IF NOT EXISTS nudges (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            badge_name TEXT,
-            earned_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(username, badge_name)
+            username TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            generated_on TEXT NOT NULL
         )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS quiz_scores (
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_nudges_user ON nudges (username, position)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+    )),
+    (6, "Persistent AI coach response cache", (
+        """
+        CREATE TABLE IF NOT EXISTS response_cache (
+            cache_key TEXT PRIMARY KEY,
+            profile_bucket TEXT NOT NULL,
+            question TEXT NOT NULL,
+            response TEXT NOT NULL,
+            embedding BLOB,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_response_cache_bucket ON response_cache (profile_bucket, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_response_cache_used ON response_cache (last_used_at)",
+    )),
+    (7, "Content hashes so bulk imports can skip rows already in the ledger", (
+        "ALTER TABLE transactions ADD COLUMN content_hash INTEGER",
+        # NULL for hand-entered rows; SQLite treats NULLs as distinct in a unique index
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_user_hash ON transactions (username, content_hash)",
+    )),
+    (8, "Stored saving runs so streaks follow the ledger's dates, backfilled from transactions", (
+        """
+        CREATE TABLE IF NOT EXISTS saving_runs (
+            username TEXT NOT NULL,
+            start_day TEXT NOT NULL,
+            end_day TEXT NOT NULL,
+            PRIMARY KEY (username, start_day)
+        ) WITHOUT ROWID
+        """,
+        "ALTER TABLE saving_streaks ADD COLUMN streak_xp INTEGER NOT NULL DEFAULT 0",
+        # Existing total_xp already includes streak XP; only record its share
+        lambda cursor: _rebuild_streaks(cursor, adjust_xp=False),
+    )),
+    (9, "Outbox of deferred streak/XP/badge work, applied by backend.events", (
+        """
+        CREATE TABLE IF NOT EXISTS events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            topic TEXT,
-            score INTEGER,
-            total INTEGER,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            username TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            payload TEXT,
+            created_at REAL NOT NULL
         )
-    """)
+        """,
+    )),
+    (10, "Daily and monthly per-category rollups for the charts, backfilled from transactions", (
+        """
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            username TEXT NOT NULL,
+            period TEXT NOT NULL,
+            type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, period, type, category)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS monthly_rollups (
+            username TEXT NOT NULL,
+            period TEXT NOT NULL,
+            type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, period, type, category)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_monthly_rollups_user_type_category ON monthly_rollups (username, type, category, amount)",
+        lambda cursor: _rebuild_rollups(cursor),
+    )),
+    (11, "Keyset index for paging history newest first (supersedes the user/date index)", (
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id ON transactions (username, date DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_transactions_user_date",
+    )),
+    (12, "Stamp precomputed nudges with the inputs they were built from", (
+        "ALTER TABLE nudges ADD COLUMN txn_count INTEGER",
+        "ALTER TABLE nudges ADD COLUMN current_streak INTEGER",
+        "ALTER TABLE nudges ADD COLUMN last_saving_date TEXT",
+    )),
+]
 
-    conn.commit()
-    conn.close()
+def get_schema_version():
+    with get_connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate():
+    """Apply every pending migration step. Returns the list of versions applied."""
+    applied = []
+    with get_connection() as conn:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, _description, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(conn.cursor())
+                    else:
+                        conn.execute(step)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except:
+                conn.rollback()
+                raise
+            applied.append(version)
+    return applied
+
+# ── Query Plan Audit ──────────────────────────────────
+
+def explain_query_plan(sql):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query (parameters bound to NULL)."""
+    names = re.findall(r":(\w+)", sql)
+    params = dict.fromkeys(names) if names else (None,) * sql.count("?")
+    with get_connection() as conn:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row["detail"] for row in rows]
+
+def audit_query_plans():
+    """Check every registered read query for full scans or temp-table sorts.
+
+    Returns a list of (query_name, plan_detail) offenders; an empty list means
+    every query is answered from an index.
+    """
+    offenders = []
+    for name, sql in AUDITED_QUERIES.items():
+        for detail in explain_query_plan(sql):
+            # Constant rows and co-routine subqueries are not table reads
+            if detail == "SCAN CONSTANT ROW" or detail.startswith("SCAN (subquery"):
+                continue
+            if name in _INDEX_SCAN_ALLOWED and "USING" in detail and "INDEX" in detail:
+                continue
+            if detail.startswith("SCAN") or "TEMP B-TREE" in detail:
+                offenders.append((name, detail))
+    return offenders
 
 # ── Auth ──────────────────────────────────────────────
 
@@ -74,230 +428,821 @@ def hash_password(password):
 
 def register_user(username, password):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users VALUES (NULL, ?, ?)",
-                       (username, hash_password(password)))
-        # Initialize streak record for new user
-        cursor.execute(
-            "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
-            (username,)
-        )
-        conn.commit()
-        conn.close()
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO users VALUES (NULL, ?, ?)",
+                           (username, hash_password(password)))
+            # Initialize streak record for new user
+            cursor.execute(
+                "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
+                (username,)
+            )
+            conn.commit()
+        bump_generation(username)
         return True
     except:
         return False
 
+_LOGIN_SQL = _audited("login_user",
+    "SELECT * FROM users WHERE username=? AND password=?")
+
 def login_user(username, password):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username=? AND password=?",
-                   (username, hash_password(password)))
-    user = cursor.fetchone()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_LOGIN_SQL, (username, hash_password(password)))
+        user = cursor.fetchone()
     return user is not None
 
 # ── Transactions ──────────────────────────────────────
 
-def add_transaction(username, amount, t_type, category):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO transactions (username, amount, type, category)
-        VALUES (?, ?, ?, ?)
-    """, (username, amount, t_type, category))
-    conn.commit()
-    conn.close()
-    # Update streak if it's a saving/income entry
-    if t_type == "Income" or category == "Investment":
-        update_streak(username)
+def _ledger_timestamp(value):
+    """A date, datetime or string → the ledger's 'YYYY-MM-DD HH:MM:SS' form."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    value = str(value)
+    return value if len(value) > 10 else f"{to_day(value)} 00:00:00"
+
+def add_transaction(username, amount, t_type, category, date=None):
+    """Record a transaction, dated now unless `date` (date, datetime or string) back-dates it."""
+    # Stamped with local time, not the column's UTC CURRENT_TIMESTAMP default,
+    # so streak days, rollups and nudges all see the student's calendar day
+    date = _ledger_timestamp(date or datetime.now())
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO transactions (username, amount, type, category, date)
+            VALUES (?, ?, ?, ?, ?)
+        """, (username, amount, t_type, category, date))
+        _apply_aggregate_deltas(cursor, [_aggregate_delta(username, amount, t_type, date)])
+        _apply_rollup_deltas(cursor, [(username, date, t_type, category, amount, 1)])
+        _discard_stored_nudges(cursor, username)
+        # A saving/income entry counts towards the streak on the day the ledger
+        # records; the worker in backend.events applies it after we return
+        saving = t_type == "Income" or category == "Investment"
+        if saving:
+            _enqueue_event(cursor, username, "saving_days", {"days": [to_day(date)]})
+        conn.commit()
+    bump_generation(username)
+    if saving:
+        _notify_outbox()
+
+_GET_TRANSACTIONS_SQL = _audited("get_transactions", """
+    SELECT amount, type, category, date
+    FROM transactions
+    WHERE username=?
+    ORDER BY date DESC
+""")
 
 def get_transactions(username):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT amount, type, category, date
-        FROM transactions
-        WHERE username=?
-        ORDER BY date DESC
-    """, (username,))
-    data = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_GET_TRANSACTIONS_SQL, (username,))
+        data = cursor.fetchall()
     return [tuple(row) for row in data]
 
+_GET_RECENT_TRANSACTIONS_SQL = _audited("get_recent_transactions", """
+    SELECT amount, type, category, date
+    FROM transactions
+    WHERE username=?
+    ORDER BY date DESC
+    LIMIT ?
+""")
+
 def get_recent_transactions(username, limit=5):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT amount, type, category, date
-        FROM transactions
-        WHERE username=?
-        ORDER BY date DESC
-        LIMIT ?
-    """, (username, limit))
-    data = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_GET_RECENT_TRANSACTIONS_SQL, (username, limit))
+        data = cursor.fetchall()
     return [tuple(row) for row in data]
 
+HISTORY_PAGE_SIZE = 50
+_NEWEST_KEY = ("9999-12-31 23:59:59", 2**63 - 1)
+
+_TRANSACTIONS_PAGE_SQL = _audited("get_transactions_page", """
+    SELECT id, amount, type, category, date
+    FROM transactions
+    WHERE username=:u
+      AND (date, id) < (:before_date, :before_id)
+      AND date >= :start
+      AND (:type IS NULL OR type=:type)
+      AND (:category IS NULL OR category=:category)
+    ORDER BY date DESC, id DESC
+    LIMIT :limit
+""")
+
+def get_transactions_page(username, before=None, limit=HISTORY_PAGE_SIZE, t_type=None, category=None,
+                          start=None, end=None):
+    """One page of history, newest first, starting after the `before` cursor.
+
+    Returns {"rows": [(amount, type, category, date), ...], "next": cursor}
+    where the cursor is the (date, id) of the last row, or None on the last
+    page. Filters: t_type, category and dates in [start, end). Each page is
+    an index range read, so its cost does not depend on how deep it is.
+    """
+    upper = tuple(before) if before else _NEWEST_KEY
+    if end is not None:
+        # Ids are positive, so (end, 0) excludes every row dated at or after end
+        upper = min(upper, (_ledger_timestamp(end), 0))
+    with get_connection() as conn:
+        rows = conn.execute(_TRANSACTIONS_PAGE_SQL, {
+            "u": username,
+            "before_date": upper[0],
+            "before_id": upper[1],
+            "start": "" if start is None else _ledger_timestamp(start),
+            "type": t_type,
+            "category": category,
+            "limit": limit + 1,
+        }).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "rows": [(row["amount"], row["type"], row["category"], row["date"]) for row in rows],
+        "next": (rows[-1]["date"], rows[-1]["id"]) if more else None,
+    }
+
+def _discard_stored_nudges(cursor, username):
+    # Precomputed nudges (backend.nudges) go stale once the ledger or streak changes
+    cursor.execute("DELETE FROM nudges WHERE username=?", (username,))
+
 # ── Saving Streaks ────────────────────────────────────
 
-def update_streak(username):
-    conn = get_connection()
-    cursor = conn.cursor()
+# saving_runs holds each user's runs of consecutive saving days. A new saving
+# day only touches the run ending the day before and the run starting the day
+# after, so back-dated entries update the streak without rescanning the ledger.
 
-    # Ensure streak record exists
-    cursor.execute(
-        "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
-        (username,)
-    )
+INCREMENTAL_STREAK_DAYS = 64   # above this many new days, rebuild the user from the ledger instead
 
-    cursor.execute(
-        "SELECT current_streak, longest_streak, last_saving_date FROM saving_streaks WHERE username=?",
-        (username,)
-    )
-    row = cursor.fetchone()
-    today = datetime.now().strftime("%Y-%m-%d")
+_GET_STREAK_STATE_SQL = _audited("update_streak",
+    "SELECT current_streak, longest_streak, last_saving_date FROM saving_streaks WHERE username=?")
 
-    if row:
-        current_streak = row["current_streak"]
-        longest_streak = row["longest_streak"]
-        last_date = row["last_saving_date"]
-
-        if last_date == today:
-            # Already logged today — no change
-            conn.close()
-            return current_streak
-
-        if last_date:
-            last = datetime.strptime(last_date, "%Y-%m-%d")
-            diff = (datetime.now() - last).days
-            if diff == 1:
-                current_streak += 1
-            elif diff > 1:
-                current_streak = 1
-        else:
-            current_streak = 1
+_RUN_AT_OR_BEFORE_SQL = _audited("saving_run_at_or_before", """
+    SELECT start_day, end_day FROM saving_runs
+    WHERE username=? AND start_day <= ?
+    ORDER BY start_day DESC
+    LIMIT 1
+""")
 
-        longest_streak = max(longest_streak, current_streak)
-    else:
-        current_streak = 1
-        longest_streak = 1
+_RUN_STARTING_SQL = _audited("saving_run_starting",
+    "SELECT start_day, end_day FROM saving_runs WHERE username=? AND start_day=?")
+
+def _credit_saving_day(cursor, username, day):
+    """Merge one saving day into the user's runs and totals. Returns False if it was already counted."""
+    before = cursor.execute(_RUN_AT_OR_BEFORE_SQL, (username, day)).fetchone()
+    if before and before["end_day"] >= day:
+        return False
+    left = make_run(before["start_day"], before["end_day"]) if before and before["end_day"] == shift_day(day, -1) else None
+    after = cursor.execute(_RUN_STARTING_SQL, (username, shift_day(day, 1))).fetchone()
+    right = make_run(after["start_day"], after["end_day"]) if after else None
 
-    # Award XP for saving: 10 XP base + streak bonus
-    xp_earned = 10 + (current_streak * 2)
+    merged, xp_earned = join_runs(day, left, right)
+    cursor.executemany(
+        "DELETE FROM saving_runs WHERE username=? AND start_day=?",
+        [(username, run.start) for run in (left, right) if run],
+    )
+    cursor.execute("INSERT INTO saving_runs (username, start_day, end_day) VALUES (?, ?, ?)",
+                   (username, merged.start, merged.end))
+
+    row = cursor.execute(_GET_STREAK_STATE_SQL, (username,)).fetchone()
+    current_streak, longest_streak, last_date = row["current_streak"], row["longest_streak"], row["last_saving_date"]
+    # The current streak is the run ending on the latest saving day
+    if last_date is None or merged.end >= last_date:
+        current_streak, last_date = merged.length, merged.end
+    longest_streak = max(longest_streak, merged.length)
 
     cursor.execute("""
         UPDATE saving_streaks
         SET current_streak=?, longest_streak=?, last_saving_date=?,
-            total_xp = total_xp + ?
+            total_xp = total_xp + ?, streak_xp = streak_xp + ?
         WHERE username=?
-    """, (current_streak, longest_streak, today, xp_earned, username))
+    """, (current_streak, longest_streak, last_date, xp_earned, xp_earned, username))
+    return True
 
-    conn.commit()
-    conn.close()
+def credit_saving_days(username, days):
+    """Credit saving days (dates or ledger timestamps, any order) to a user's streak.
+
+    Returns the current streak. Days already counted are ignored; past
+    INCREMENTAL_STREAK_DAYS new days the user's streak is rebuilt from the
+    ledger in one pass instead.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            changed = _credit_saving_days(cursor, username, days)
+            current_streak = cursor.execute(_GET_STREAK_STATE_SQL, (username,)).fetchone()["current_streak"]
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+    if changed:
+        bump_generation(username)
     return current_streak
 
-def get_streak(username):
-    conn = get_connection()
-    cursor = conn.cursor()
+def _credit_saving_days(cursor, username, days):
+    """credit_saving_days() inside the caller's transaction; days=None rebuilds. Returns whether anything changed."""
     cursor.execute(
-        "SELECT current_streak, longest_streak, last_saving_date, total_xp FROM saving_streaks WHERE username=?",
+        "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
         (username,)
     )
-    row = cursor.fetchone()
-    conn.close()
+    days = None if days is None else sorted({to_day(day) for day in days})
+    if days is None or len(days) > INCREMENTAL_STREAK_DAYS:
+        _rebuild_streaks(cursor, username)
+        changed = True
+    else:
+        changed = False
+        for day in days:
+            changed = _credit_saving_day(cursor, username, day) or changed
+    if changed:
+        _discard_stored_nudges(cursor, username)
+    return changed
+
+def apply_streak_updates(updates, events_through=None):
+    """Credit saving days for many users in one transaction.
+
+    `updates` maps username → saving days, or None to rebuild that user from
+    the ledger. With events_through, outbox events up to that id are deleted
+    in the same transaction, so each is applied exactly once. Returns the
+    usernames whose streak changed.
+    """
+    changed = []
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            for username, days in updates.items():
+                if _credit_saving_days(cursor, username, days):
+                    changed.append(username)
+            if events_through is not None:
+                cursor.execute("DELETE FROM events WHERE id <= ?", (events_through,))
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+    for username in changed:
+        bump_generation(username)
+    return changed
+
+def update_streak(username, saving_date=None):
+    """Credit one saving day (default: today) and return the current streak.
+
+    Each new saving day earns 10 XP plus 2 per day of its streak; a back-dated
+    day that joins or extends a run also re-prices the later days of that run.
+    """
+    return credit_saving_days(username, [saving_date or datetime.now()])
+
+_SAVING_DAYS_SQL = """
+    SELECT username, substr(date, 1, 10) AS day
+    FROM transactions
+    WHERE (type='Income' OR category='Investment') AND date IS NOT NULL {scope}
+    GROUP BY username, day
+    ORDER BY username, day
+"""
+
+def _rebuild_streaks(cursor, username=None, adjust_xp=True):
+    """Recompute saving runs and streaks from the ledger (one user, or everyone).
+
+    total_xp moves by the change in streak XP, so XP from quizzes and other
+    sources is kept; with adjust_xp=False only the streak share is recorded.
+    """
+    scope, params = ("AND username=?", (username,)) if username else ("", ())
+    rows = cursor.execute(_SAVING_DAYS_SQL.format(scope=scope), params)
+    if username is None:
+        runs, states = all_user_streaks(rows.fetchall())
+    else:
+        user_runs = saving_runs(row["day"] for row in rows)
+        runs = [(username, run.start, run.end) for run in user_runs]
+        states = [(username, *streak_state(user_runs))] if user_runs else []
+
+    cursor.execute(f"DELETE FROM saving_runs {'WHERE username=?' if username else ''}", params)
+    cursor.executemany("INSERT INTO saving_runs (username, start_day, end_day) VALUES (?, ?, ?)", runs)
+    cursor.execute(f"""
+        UPDATE saving_streaks
+        SET current_streak=0, longest_streak=0, last_saving_date=NULL,
+            total_xp = total_xp - CASE WHEN ? THEN streak_xp ELSE 0 END, streak_xp=0
+        {'WHERE username=?' if username else ''}
+    """, (adjust_xp, *params))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
+        [(state[0],) for state in states]
+    )
+    cursor.executemany("""
+        UPDATE saving_streaks
+        SET current_streak=?, longest_streak=?, last_saving_date=?,
+            total_xp = total_xp + CASE WHEN ? THEN ? ELSE 0 END, streak_xp=?
+        WHERE username=?
+    """, [(current, longest, last, adjust_xp, xp, xp, user) for user, current, longest, last, xp in states])
+
+def rebuild_streaks(username=None):
+    """Recompute streaks and streak XP from the ledger (one user, or everyone)."""
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            _rebuild_streaks(cursor, username)
+            if username:
+                _discard_stored_nudges(cursor, username)
+            else:
+                cursor.execute("DELETE FROM nudges")
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+    bump_generation(username)
+
+_GET_STREAK_SQL = _audited("get_streak",
+    "SELECT current_streak, longest_streak, last_saving_date, total_xp FROM saving_streaks WHERE username=?")
+
+STREAK_CACHE_SIZE = 4096
+_streak_cache = LRUCache(maxsize=STREAK_CACHE_SIZE)
+
+def get_streak(username):
+    key = (username, get_generation(username))
+    cached = _streak_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_GET_STREAK_SQL, (username,))
+        row = cursor.fetchone()
     if row:
-        return {
+        streak = {
             "current_streak": row["current_streak"],
             "longest_streak": row["longest_streak"],
             "last_saving_date": row["last_saving_date"],
             "total_xp": row["total_xp"]
         }
-    return {"current_streak": 0, "longest_streak": 0, "last_saving_date": None, "total_xp": 0}
+    else:
+        streak = {"current_streak": 0, "longest_streak": 0, "last_saving_date": None, "total_xp": 0}
+    _streak_cache.set(key, streak)
+    return dict(streak)
+
+def get_streak_cache_stats():
+    return _streak_cache.stats()
+
+_XP_LEADERBOARD_SQL = _audited("get_xp_leaderboard",
+    "SELECT username, total_xp FROM saving_streaks ORDER BY total_xp DESC LIMIT ?",
+    index_scan_ok=True)
+
+def get_xp_leaderboard(limit=None):
+    """Return (username, total_xp) rows, highest XP first. limit=None returns everyone."""
+    with get_connection() as conn:
+        rows = conn.execute(_XP_LEADERBOARD_SQL, (-1 if limit is None else limit,)).fetchall()
+    return [tuple(row) for row in rows]
 
 # ── Badges ────────────────────────────────────────────
 
 def award_badge(username, badge_name):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR IGNORE INTO badges (username, badge_name) VALUES (?, ?)",
-            (username, badge_name)
-        )
-        conn.commit()
-        conn.close()
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR IGNORE INTO badges (username, badge_name) VALUES (?, ?)",
+                (username, badge_name)
+            )
+            conn.commit()
+        # Pages re-award on every rerun; only a new badge invalidates caches
+        if cursor.rowcount > 0:
+            bump_generation(username)
+        return True
+    except:
+        return False
+
+_GET_BADGES_SQL = _audited("get_badges",
+    "SELECT badge_name, earned_date FROM badges WHERE username=? ORDER BY earned_date DESC")
+
+def award_badges(username, badge_names):
+    """Award several badges in one transaction. Already-earned badges are ignored."""
+    if not badge_names:
+        return True
+    try:
+        with get_connection() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO badges (username, badge_name) VALUES (?, ?)",
+                [(username, name) for name in badge_names]
+            )
+            conn.commit()
+        if cursor.rowcount > 0:
+            bump_generation(username)
         return True
     except:
         return False
 
 def get_badges(username):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT badge_name, earned_date FROM badges WHERE username=? ORDER BY earned_date DESC",
-        (username,)
-    )
-    data = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_GET_BADGES_SQL, (username,))
+        data = cursor.fetchall()
     return [{"name": row["badge_name"], "date": row["earned_date"]} for row in data]
 
 # ── Quiz Scores ───────────────────────────────────────
 
 def save_quiz_score(username, topic, score, total):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO quiz_scores (username, topic, score, total)
-        VALUES (?, ?, ?, ?)
-    """, (username, topic, score, total))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO quiz_scores (username, topic, score, total)
+            VALUES (?, ?, ?, ?)
+        """, (username, topic, score, total))
+        conn.commit()
+    bump_generation(username)
     # Award XP for quiz completion
     add_xp(username, 15 + score * 5)
 
+_GET_QUIZ_SCORES_SQL = _audited("get_quiz_scores", """
+    SELECT topic, score, total, date
+    FROM quiz_scores
+    WHERE username=?
+    ORDER BY date DESC
+""")
+
 def get_quiz_scores(username):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT topic, score, total, date
-        FROM quiz_scores
-        WHERE username=?
-        ORDER BY date DESC
-    """, (username,))
-    data = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_GET_QUIZ_SCORES_SQL, (username,))
+        data = cursor.fetchall()
     return [dict(row) for row in data]
 
 # ── XP Helpers ────────────────────────────────────────
 
 def add_xp(username, xp_amount):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
-        (username,)
-    )
-    cursor.execute(
-        "UPDATE saving_streaks SET total_xp = total_xp + ? WHERE username=?",
-        (xp_amount, username)
-    )
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO saving_streaks (username) VALUES (?)",
+            (username,)
+        )
+        cursor.execute(
+            "UPDATE saving_streaks SET total_xp = total_xp + ? WHERE username=?",
+            (xp_amount, username)
+        )
+        conn.commit()
+    bump_generation(username)
 
 def get_total_savings(username):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT COALESCE(SUM(amount),0) FROM transactions WHERE username=? AND type='Income'",
-        (username,)
-    )
-    income = cursor.fetchone()[0]
+    totals = get_user_aggregates(username)
+    return totals["income"] - totals["expense"]
+
+# ── Gamification Snapshot ─────────────────────────────
+
+_BADGE_NAME_SEP = "\x1f"
+
+_GAMIFICATION_SNAPSHOT_SQL = _audited("get_gamification_snapshot", """
+    SELECT
+        (SELECT current_streak FROM saving_streaks WHERE username=:u) AS current_streak,
+        (SELECT longest_streak FROM saving_streaks WHERE username=:u) AS longest_streak,
+        (SELECT last_saving_date FROM saving_streaks WHERE username=:u) AS last_saving_date,
+        (SELECT total_xp FROM saving_streaks WHERE username=:u) AS total_xp,
+        (SELECT income - expense FROM user_aggregates WHERE username=:u) AS total_savings,
+        (SELECT COUNT(*) FROM quiz_scores WHERE username=:u) AS quiz_count,
+        (SELECT group_concat(badge_name, char(31)) FROM badges WHERE username=:u) AS badge_names
+""")
+
+def get_gamification_snapshot(username):
+    """Fetch streak, XP, savings, quiz count and earned badge names in a single query."""
+    with get_connection() as conn:
+        row = conn.execute(_GAMIFICATION_SNAPSHOT_SQL, {"u": username}).fetchone()
+    return {
+        "current_streak": row["current_streak"] or 0,
+        "longest_streak": row["longest_streak"] or 0,
+        "last_saving_date": row["last_saving_date"],
+        "total_xp": row["total_xp"] or 0,
+        "total_savings": row["total_savings"] or 0,
+        "quiz_count": row["quiz_count"],
+        "badges": set(row["badge_names"].split(_BADGE_NAME_SEP)) if row["badge_names"] else set(),
+    }
+
+# ── Ledger Aggregates ─────────────────────────────────
+# user_aggregates keeps running totals per user so balance reads are a single
+# primary-key lookup. Every writer to transactions must apply its deltas in the
+# same database transaction as the insert.
+
+_UPSERT_AGGREGATES_SQL = """
+    INSERT INTO user_aggregates (username, income, expense, txn_count, first_txn_date, last_txn_date)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(username) DO UPDATE SET
+        income = income + excluded.income,
+        expense = expense + excluded.expense,
+        txn_count = txn_count + excluded.txn_count,
+        first_txn_date = MIN(COALESCE(first_txn_date, excluded.first_txn_date), excluded.first_txn_date),
+        last_txn_date = MAX(COALESCE(last_txn_date, excluded.last_txn_date), excluded.last_txn_date)
+"""
+
+_LEDGER_TOTALS_SQL = """
+    SELECT username,
+           COALESCE(SUM(CASE WHEN type='Income' THEN amount END), 0) AS income,
+           COALESCE(SUM(CASE WHEN type='Expense' THEN amount END), 0) AS expense,
+           COUNT(*) AS txn_count,
+           MIN(date) AS first_txn_date,
+           MAX(date) AS last_txn_date
+    FROM transactions
+"""
+
+def _aggregate_delta(username, amount, t_type, date):
+    income = amount if t_type == "Income" else 0
+    expense = amount if t_type == "Expense" else 0
+    return (username, income, expense, 1, date, date)
+
+def _apply_aggregate_deltas(cursor, deltas):
+    """Fold (username, income, expense, count, first_date, last_date) deltas into user_aggregates."""
+    cursor.executemany(_UPSERT_AGGREGATES_SQL, deltas)
+
+def _rebuild_aggregates(cursor, username=None):
+    if username is None:
+        cursor.execute("DELETE FROM user_aggregates")
+        cursor.execute(f"INSERT INTO user_aggregates {_LEDGER_TOTALS_SQL} GROUP BY username")
+    else:
+        cursor.execute("DELETE FROM user_aggregates WHERE username=?", (username,))
+        cursor.execute(
+            f"INSERT INTO user_aggregates {_LEDGER_TOTALS_SQL} WHERE username=? GROUP BY username",
+            (username,)
+        )
+
+_GET_AGGREGATES_SQL = _audited("get_user_aggregates",
+    "SELECT income, expense, txn_count, first_txn_date, last_txn_date FROM user_aggregates WHERE username=?")
+
+def get_user_aggregates(username):
+    """Return running income, expense, transaction count and first/last transaction date."""
+    with get_connection() as conn:
+        row = conn.execute(_GET_AGGREGATES_SQL, (username,)).fetchone()
+    if row:
+        return dict(row)
+    return {"income": 0, "expense": 0, "txn_count": 0, "first_txn_date": None, "last_txn_date": None}
+
+def rebuild_user_aggregates(username=None):
+    """Recompute user_aggregates from the transactions ledger (one user, or everyone)."""
+    with get_connection() as conn:
+        _rebuild_aggregates(conn.cursor(), username)
+        conn.commit()
+    bump_generation(username)
+
+def verify_user_aggregates(tolerance=0.005):
+    """Compare user_aggregates against the ledger. Returns the usernames that disagree."""
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT l.username
+            FROM ({_LEDGER_TOTALS_SQL} GROUP BY username) AS l
+            LEFT JOIN user_aggregates AS a ON a.username = l.username
+            WHERE a.username IS NULL
+               OR ABS(a.income - l.income) > :tol
+               OR ABS(a.expense - l.expense) > :tol
+               OR a.txn_count != l.txn_count
+               OR a.first_txn_date IS NOT l.first_txn_date
+               OR a.last_txn_date IS NOT l.last_txn_date
+            UNION
+            SELECT a.username
+            FROM user_aggregates AS a
+            WHERE a.txn_count > 0
+              AND NOT EXISTS (SELECT 1 FROM transactions t WHERE t.username = a.username)
+        """, {"tol": tolerance}).fetchall()
+    return [row["username"] for row in rows]
+
+# ── Event Outbox ──────────────────────────────────────
+# Side effects that can wait (streak, XP, badges) are written to the events
+# table in the same transaction as the change that causes them and applied
+# later, in batches, by backend.events.
+
+_outbox_listeners = []
+
+def add_outbox_listener(callback):
+    """Call `callback()` after each commit that queues events (backend.events wakes its worker with it)."""
+    if callback not in _outbox_listeners:
+        _outbox_listeners.append(callback)
+
+def _notify_outbox():
+    for callback in _outbox_listeners:
+        callback()
+
+def _enqueue_event(cursor, username, kind, payload=None):
     cursor.execute(
-        "SELECT COALESCE(SUM(amount),0) FROM transactions WHERE username=? AND type='Expense'",
-        (username,)
+        "INSERT INTO events (username, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+        (username, kind, None if payload is None else json.dumps(payload), datetime.now().timestamp())
     )
-    expense = cursor.fetchone()[0]
-    conn.close()
-    return income - expense
+
+def enqueue_event(username, kind, payload=None):
+    """Queue one event in its own transaction."""
+    with get_connection() as conn:
+        _enqueue_event(conn.cursor(), username, kind, payload)
+        conn.commit()
+    _notify_outbox()
+
+_PENDING_EVENTS_SQL = _audited("pending_events",
+    "SELECT id, username, kind, payload, created_at FROM events WHERE id > ? ORDER BY id LIMIT ?")
+
+def fetch_events(limit, after_id=0):
+    """The oldest pending events as dicts with the payload decoded."""
+    with get_connection() as conn:
+        rows = conn.execute(_PENDING_EVENTS_SQL, (after_id, limit)).fetchall()
+    return [
+        {**dict(row), "payload": None if row["payload"] is None else json.loads(row["payload"])}
+        for row in rows
+    ]
+
+def get_outbox_status():
+    """Pending event count and the age in seconds of the oldest one."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT COUNT(*) AS pending, MIN(created_at) AS oldest FROM events").fetchone()
+    return {
+        "pending": row["pending"],
+        "oldest_age_s": None if row["oldest"] is None else max(datetime.now().timestamp() - row["oldest"], 0.0),
+    }
+
+# ── Ledger Rollups ────────────────────────────────────
+# daily_rollups and monthly_rollups hold per-period, per-type, per-category
+# totals so charts read rows per category and period instead of per
+# transaction. Like user_aggregates, every writer to transactions must apply
+# its deltas in the same database transaction as the insert.
+
+ROLLUP_PERIODS = {"daily_rollups": 10, "monthly_rollups": 7}   # table -> prefix length of the ledger date
+
+_UPSERT_ROLLUP_SQL = """
+    INSERT INTO {table} (username, period, type, category, amount, txn_count)
+    VALUES (?, substr(?, 1, {width}), ?, COALESCE(?, 'Other'), ?, ?)
+    ON CONFLICT(username, period, type, category) DO UPDATE SET
+        amount = amount + excluded.amount,
+        txn_count = txn_count + excluded.txn_count
+"""
+
+_LEDGER_ROLLUP_SQL = """
+    SELECT username, substr(date, 1, {width}) AS period, type, COALESCE(category, 'Other') AS category,
+           SUM(amount) AS amount, COUNT(*) AS txn_count
+    FROM transactions
+    WHERE date IS NOT NULL {scope}
+    GROUP BY username, period, type, COALESCE(category, 'Other')
+"""
+
+def _apply_rollup_deltas(cursor, deltas):
+    """Fold (username, date, type, category, amount, count) deltas into both rollup tables."""
+    for table, width in ROLLUP_PERIODS.items():
+        cursor.executemany(_UPSERT_ROLLUP_SQL.format(table=table, width=width), deltas)
+
+def _apply_rollups_since(cursor, username, after_id):
+    """Fold the user's transactions with id > after_id into both rollup tables (bulk inserts)."""
+    for table, width in ROLLUP_PERIODS.items():
+        select = _LEDGER_ROLLUP_SQL.format(width=width, scope="AND id > ? AND username = ?")
+        cursor.execute(f"""
+            INSERT INTO {table} (username, period, type, category, amount, txn_count)
+            {select}
+            ON CONFLICT(username, period, type, category) DO UPDATE SET
+                amount = amount + excluded.amount,
+                txn_count = txn_count + excluded.txn_count
+        """, (after_id, username))
+
+def _rebuild_rollups(cursor, username=None):
+    scope, params = ("AND username = ?", (username,)) if username else ("", ())
+    for table, width in ROLLUP_PERIODS.items():
+        cursor.execute(f"DELETE FROM {table} {'WHERE username = ?' if username else ''}", params)
+        cursor.execute(
+            f"INSERT INTO {table} (username, period, type, category, amount, txn_count) "
+            + _LEDGER_ROLLUP_SQL.format(width=width, scope=scope),
+            params
+        )
+
+def rebuild_rollups(username=None):
+    """Recompute the daily and monthly rollups from the transactions ledger (one user, or everyone)."""
+    with get_connection() as conn:
+        _rebuild_rollups(conn.cursor(), username)
+        conn.commit()
+    bump_generation(username)
+
+def verify_rollups(tolerance=0.005):
+    """Compare both rollup tables against the ledger. Returns the usernames that disagree."""
+    mismatched = set()
+    with get_connection() as conn:
+        for table, width in ROLLUP_PERIODS.items():
+            # Ledger rows minus rollup rows; any key that doesn't cancel out disagrees
+            rows = conn.execute(f"""
+                SELECT DISTINCT username
+                FROM (
+                    {_LEDGER_ROLLUP_SQL.format(width=width, scope="")}
+                    UNION ALL
+                    SELECT username, period, type, category, -amount, -txn_count FROM {table}
+                )
+                GROUP BY username, period, type, category
+                HAVING ABS(SUM(amount)) > :tol OR SUM(txn_count) != 0
+            """, {"tol": tolerance}).fetchall()
+            mismatched.update(row["username"] for row in rows)
+    return sorted(mismatched)
+
+# ── Response Cache ────────────────────────────────────
+# Storage for ai.chatbot's answer cache. Entries older than the caller's TTL
+# are ignored on read and purged on write, and the table is trimmed to
+# `max_entries` by least recent use.
+
+_CACHED_RESPONSE_SQL = _audited("get_cached_response",
+    "SELECT response, created_at FROM response_cache WHERE cache_key=? AND created_at >= ?")
+
+_CACHED_EMBEDDINGS_SQL = _audited("get_cached_embeddings",
+    "SELECT response, created_at, embedding FROM response_cache WHERE profile_bucket=? AND created_at >= ?")
+
+def get_cached_response(cache_key, min_created_at):
+    """(response, created_at) for `cache_key` if it is fresh enough, else None. Counts the hit."""
+    with get_connection() as conn:
+        row = conn.execute(_CACHED_RESPONSE_SQL, (cache_key, min_created_at)).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE response_cache SET hits = hits + 1, last_used_at = ? WHERE cache_key=?",
+            (datetime.now().timestamp(), cache_key)
+        )
+        conn.commit()
+    return row["response"], row["created_at"]
+
+def record_cached_response_hits(hits):
+    """Count hits served from ai.chatbot's in-memory cache: (hits, last_used_at, cache_key) tuples."""
+    with get_connection() as conn:
+        conn.executemany(
+            "UPDATE response_cache SET hits = hits + ?, last_used_at = MAX(last_used_at, ?) WHERE cache_key=?",
+            hits
+        )
+        conn.commit()
+
+def get_cached_embeddings(profile_bucket, min_created_at):
+    """(response, created_at, embedding bytes) for fresh entries in a bucket that have an embedding."""
+    with get_connection() as conn:
+        rows = conn.execute(_CACHED_EMBEDDINGS_SQL, (profile_bucket, min_created_at)).fetchall()
+    return [tuple(row) for row in rows if row["embedding"] is not None]
+
+def store_cached_response(cache_key, profile_bucket, question, response, embedding=None,
+                          min_created_at=None, max_entries=None):
+    """Insert or replace one cache entry, then purge expired and least recently used entries."""
+    now = datetime.now().timestamp()
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO response_cache
+                (cache_key, profile_bucket, question, response, embedding, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (cache_key, profile_bucket, question, response, embedding, now, now))
+        if min_created_at is not None:
+            conn.execute("DELETE FROM response_cache WHERE created_at < ?", (min_created_at,))
+        if max_entries is not None:
+            conn.execute("""
+                DELETE FROM response_cache WHERE cache_key IN (
+                    SELECT cache_key FROM response_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_entries,))
+        conn.commit()
+
+def count_cached_responses():
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+def clear_cached_responses():
+    with get_connection() as conn:
+        conn.execute("DELETE FROM response_cache")
+        conn.commit()
+
+
+# Modules that register audited queries of their own
+_QUERY_MODULES = ("backend.analytics", "backend.nudges")
+
+if __name__ == "__main__":
+    import argparse
+    import importlib
+    import sys
+
+    parser = argparse.ArgumentParser(description="FinMentor database maintenance")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="create tables and apply pending migrations")
+    commands.add_parser("audit", help="fail if any registered query falls back to a table scan")
+    commands.add_parser("rebuild-aggregates", help="recompute user_aggregates from the ledger")
+    commands.add_parser("verify-aggregates", help="fail if user_aggregates disagrees with the ledger")
+    commands.add_parser("rebuild-rollups", help="recompute the daily and monthly rollups from the ledger")
+    commands.add_parser("verify-rollups", help="fail if the rollups disagree with the ledger")
+    args = parser.parse_args()
+
+    # Work through the importable module so query registrations from other
+    # backend modules land in the same registry as the functions we call.
+    db = importlib.import_module("backend.database")
+    for module_name in _QUERY_MODULES:
+        importlib.import_module(module_name)
+    db.DB_NAME = args.db
+    db.create_tables()
+
+    if args.command == "migrate":
+        print(f"Schema version {db.get_schema_version()}")
+    elif args.command == "audit":
+        offenders = db.audit_query_plans()
+        for name, detail in offenders:
+            print(f"SCAN  {name}: {detail}")
+        print(f"{len(db.AUDITED_QUERIES)} queries audited, {len(offenders)} offending plan steps")
+        sys.exit(1 if offenders else 0)
+    elif args.command == "rebuild-aggregates":
+        db.rebuild_user_aggregates()
+        print("user_aggregates rebuilt")
+    elif args.command == "verify-aggregates":
+        mismatched = db.verify_user_aggregates()
+        for name in mismatched:
+            print(f"MISMATCH  {name}")
+        print(f"{len(mismatched)} users out of sync")
+        sys.exit(1 if mismatched else 0)
+    elif args.command == "rebuild-rollups":
+        db.rebuild_rollups()
+        print("daily_rollups and monthly_rollups rebuilt")
+    elif args.command == "verify-rollups":
+        mismatched = db.verify_rollups()
+        for name in mismatched:
+            print(f"MISMATCH  {name}")
+        print(f"{len(mismatched)} users out of sync")
+        sys.exit(1 if mismatched else 0)
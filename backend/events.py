@@ -0,0 +1,170 @@
+"""
+Events — Write-behind worker for streak, XP and badge side effects.
+
+add_transaction() and the importer record what a saving changes in the events
+outbox (see backend.database) in the same commit as the write, and return. A
+background thread applies pending events in batches: one transaction for all
+the streak and XP updates in a batch, which also deletes the events it
+applied, then one badge check per affected user. Badges it awards are held
+for pop_new_badges() so pages can still show a toast.
+"""
+
+import threading
+import time
+from collections import deque
+
+from backend.database import (
+    add_outbox_listener, apply_streak_updates, fetch_events, get_outbox_status,
+)
+from backend.gamification import check_and_award_badges
+
+EVENT_BATCH_SIZE = 500
+POLL_INTERVAL = 2.0    # seconds; also picks up events queued before a restart or by another process
+ERROR_BACKOFF = 5.0
+BATCH_TIMINGS_WINDOW = 200
+
+_process_lock = threading.Lock()
+_new_badges = {}
+_badges_lock = threading.Lock()
+_stats = {"applied": 0, "batches": 0, "errors": 0, "last_error": None}
+_batch_seconds = deque(maxlen=BATCH_TIMINGS_WINDOW)
+
+# ── Applying Events ───────────────────────────────────
+
+def _streak_updates(events):
+    """Fold a batch of events into {username: saving days, or None to rebuild}."""
+    updates = {}
+    for event in events:
+        days = updates.setdefault(event["username"], set())
+        if event["kind"] == "rebuild_streak":
+            updates[event["username"]] = None
+        elif event["kind"] == "saving_days" and days is not None:
+            days.update(event["payload"]["days"])
+    return updates
+
+def process_pending(batch_size=EVENT_BATCH_SIZE):
+    """Apply up to batch_size of the oldest pending events. Returns how many were applied."""
+    with _process_lock:
+        events = fetch_events(batch_size)
+        if not events:
+            return 0
+        started = time.perf_counter()
+        updates = _streak_updates(events)
+        apply_streak_updates(updates, events_through=events[-1]["id"])
+        # Badge checks are idempotent, so a crash before this point only delays them
+        for username in updates:
+            earned = check_and_award_badges(username)
+            if earned:
+                with _badges_lock:
+                    _new_badges.setdefault(username, []).extend(earned)
+        _batch_seconds.append(time.perf_counter() - started)
+        _stats["applied"] += len(events)
+        _stats["batches"] += 1
+        return len(events)
+
+def pop_new_badges(username):
+    """Badges the worker awarded this user since the last call, oldest first."""
+    with _badges_lock:
+        return _new_badges.pop(username, [])
+
+# ── Worker ────────────────────────────────────────────
+
+class EventWorker:
+    """Daemon thread that applies the outbox whenever it is woken, and every poll_interval."""
+
+    def __init__(self, batch_size=EVENT_BATCH_SIZE, poll_interval=POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="event-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self._idle:
+                self._busy = True
+            try:
+                while not self._stop.is_set() and process_pending(self.batch_size):
+                    pass
+            except Exception as e:
+                _stats["errors"] += 1
+                _stats["last_error"] = str(e)
+                self._stop.wait(ERROR_BACKOFF)
+            finally:
+                with self._idle:
+                    self._busy = False
+                    self._idle.notify_all()
+
+    def drain(self, timeout=None):
+        """Block until the outbox is empty and the worker idle. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._idle:
+                if not self._busy and get_outbox_status()["pending"] == 0:
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.wake()
+                self._idle.wait(0.05 if remaining is None else min(remaining, 0.05))
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def start_worker():
+    """Start the process-wide worker (idempotent; every Streamlit rerun may call it)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = EventWorker()
+            add_outbox_listener(_worker.wake)
+        return _worker.start()
+
+def stop_worker(timeout=None):
+    if _worker is not None:
+        _worker.stop(timeout)
+
+def drain(timeout=None):
+    """Wait for every queued event to be applied.
+
+    Without a running worker (scripts, benchmarks) the events are applied
+    here instead. Returns False if the timeout ran out first.
+    """
+    if _worker is not None and _worker.is_alive():
+        return _worker.drain(timeout)
+    while process_pending():
+        pass
+    return True
+
+def get_event_stats():
+    """Outbox depth and lag, plus what the worker has applied so far."""
+    stats = dict(_stats)
+    stats.update(get_outbox_status())
+    timings = sorted(_batch_seconds)
+    stats["batch_p50_s"] = timings[len(timings) // 2] if timings else None
+    stats["worker_running"] = _worker is not None and _worker.is_alive()
+    return stats
@@ -1,3 +1,9 @@
+import math
+
+import numpy as np
+
+from backend.cache import LRUCache
+
 def calculate_monthly_savings(income, expenses):
     return max(income - expenses, 0)
 
@@ -6,3 +12,209 @@ def compound_growth(monthly, rate, months):
     if r == 0:
         return monthly * months
     return monthly * (((1 + r) ** months - 1) / r)
+
+def contribution_schedule(monthly, months, step_up=0.0):
+    """Per-month contributions as an array of length `months`.
+
+    `monthly` is either a flat amount or a sequence of per-month amounts.
+    `step_up` raises a flat amount once every 12 months (0.10 = +10% a year, as in a step-up SIP).
+    """
+    if np.ndim(monthly) == 0:
+        years_elapsed = np.arange(months) // 12
+        return monthly * (1 + step_up) ** years_elapsed
+    contributions = np.asarray(monthly, dtype=float)
+    if contributions.shape != (months,):
+        raise ValueError(f"Expected {months} monthly contributions, got {contributions.shape[0]}")
+    return contributions
+
+# ── Projection Cache ─────────────────────────────────
+# Simulator and goal-tracker reruns mostly repeat the same inputs, across all
+# sessions, so projections are memoized process-wide on normalized inputs
+# (amounts to the paisa, rates to 1e-12). Cached arrays are read-only.
+
+PROJECTION_CACHE_SIZE = 256
+_projection_cache = LRUCache(maxsize=PROJECTION_CACHE_SIZE)
+
+def _normalize_amounts(monthly):
+    if np.ndim(monthly) == 0:
+        return round(float(monthly), 2)
+    return tuple(np.round(np.asarray(monthly, dtype=float), 2).tolist())
+
+def _normalize_rates(rates):
+    return tuple(round(float(rate), 12) for rate in np.atleast_1d(np.asarray(rates, dtype=float)).ravel())
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+def get_projection_cache_stats():
+    return _projection_cache.stats()
+
+def clear_projection_cache():
+    _projection_cache.clear()
+
+def growth_curve(monthly, rates, months, step_up=0.0):
+    """Portfolio value at the end of every month, for several annual rates at once.
+
+    Returns a read-only (len(rates), months) array whose column m-1 is the value
+    after m months. Contributions land at the end of each month, so a flat
+    `monthly` with no step-up matches compound_growth() exactly.
+    """
+    key = ("growth_curve", _normalize_amounts(monthly), _normalize_rates(rates),
+           int(months), round(float(step_up), 12))
+    curve = _projection_cache.get(key)
+    if curve is None:
+        curve = _read_only(_growth_curve(monthly, rates, int(months), step_up))
+        _projection_cache.set(key, curve)
+    return curve
+
+def _growth_curve(monthly, rates, months, step_up):
+    rates = np.atleast_1d(np.asarray(rates, dtype=float)).ravel()
+    r = rates[:, None] / 12
+    n = np.arange(1, months + 1)
+    growth = (1 + r) ** n
+
+    if np.ndim(monthly) == 0 and not step_up:
+        # Closed-form annuity; r == 0 degenerates to plain accumulation
+        safe_r = np.where(r == 0, 1.0, r)
+        return monthly * np.where(r == 0, n, (growth - 1) / safe_r)
+
+    # Value after m months = sum_k c_k (1+r)^(m-k) = (1+r)^m * cumsum(c_k / (1+r)^k)
+    contributions = contribution_schedule(monthly, months, step_up)
+    return growth * np.cumsum(contributions / growth, axis=1)
+
+# ── Monte Carlo ──────────────────────────────────────
+
+def simulate_paths(monthly, mean, volatility, months, n_paths=10_000, goal=None,
+                   seed=None, step_up=0.0, max_block_elements=4_000_000):
+    """Simulate `n_paths` portfolios with normally distributed monthly returns.
+
+    Returns are drawn with an annual `mean` and `volatility` (mean/12 and
+    volatility/sqrt(12) per month, floored at -95%). Paths are never looped over
+    in Python: months are processed in blocks of at most `max_block_elements`
+    draws, so memory stays bounded for large path counts. Results are
+    reproducible for a given `seed` and block size, and seeded runs are cached.
+
+    Returns a dict with per-month P5/P50/P95 bands (read-only arrays), the mean
+    final value and, when `goal` is given, the probability of ending at or above it.
+    """
+    if seed is None:
+        return _simulate_paths(monthly, mean, volatility, months, n_paths, goal,
+                               seed, step_up, max_block_elements)
+    key = ("simulate_paths", _normalize_amounts(monthly), round(float(mean), 12), round(float(volatility), 12),
+           int(months), int(n_paths), None if goal is None else round(float(goal), 2),
+           seed, round(float(step_up), 12), int(max_block_elements))
+    result = _projection_cache.get(key)
+    if result is None:
+        result = _simulate_paths(monthly, mean, volatility, months, n_paths, goal,
+                                 seed, step_up, max_block_elements)
+        for name in ("months", "p5", "p50", "p95"):
+            _read_only(result[name])
+        _projection_cache.set(key, result)
+    return dict(result)
+
+def _simulate_paths(monthly, mean, volatility, months, n_paths, goal,
+                    seed, step_up, max_block_elements):
+    if n_paths <= 0 or months <= 0:
+        raise ValueError("n_paths and months must be positive")
+    rng = np.random.default_rng(seed)
+    contributions = contribution_schedule(monthly, months, step_up)
+    mu, sigma = mean / 12, volatility / math.sqrt(12)
+    block = max(1, max_block_elements // n_paths)
+
+    bands = np.empty((3, months))
+    values = np.zeros(n_paths)
+    for start in range(0, months, block):
+        end = min(start + block, months)
+        # Month-major (months x paths) keeps each month's paths contiguous for the percentiles
+        returns = rng.normal(mu, sigma, size=(end - start, n_paths))
+        np.maximum(returns, -0.95, out=returns)
+        # Value after month j = G_j * (V_0 + sum_{i<=j} c_i / G_i), G = cumulative growth in block
+        growth = np.cumprod(1 + returns, axis=0)
+        block_values = growth * (values + np.cumsum(contributions[start:end, None] / growth, axis=0))
+        bands[:, start:end] = np.percentile(block_values, [5, 50, 95], axis=1)
+        values = block_values[-1]
+
+    return {
+        "months": np.arange(1, months + 1),
+        "p5": bands[0],
+        "p50": bands[1],
+        "p95": bands[2],
+        "mean_final": float(values.mean()),
+        "probability": float(np.mean(values >= goal)) if goal is not None else None,
+    }
+
+# ── Goal Solvers ──────────────────────────────────────
+# Inverses of compound_growth(): each answers "what would it take to reach
+# `goal`?" for one unknown, in constant time (or a bounded number of iterations).
+
+def required_monthly(goal, rate, months):
+    """Monthly contribution that grows to exactly `goal` after `months` at `rate`."""
+    if months <= 0:
+        raise ValueError("months must be positive")
+    r = rate / 12
+    if r == 0:
+        return goal / months
+    return goal * r / ((1 + r) ** months - 1)
+
+def required_months(goal, monthly, rate):
+    """Fewest whole months of `monthly` contributions at `rate` needed to reach `goal`."""
+    if goal <= 0:
+        return 0
+    if monthly <= 0:
+        raise ValueError("monthly must be positive")
+    r = rate / 12
+    if r == 0:
+        months = math.ceil(goal / monthly)
+    else:
+        months = math.ceil(math.log(goal * r / monthly + 1) / math.log(1 + r))
+    # Guard against float rounding pushing the ceiling one month too far
+    if months > 1 and compound_growth(monthly, rate, months - 1) >= goal:
+        months -= 1
+    return months
+
+def required_rate(goal, monthly, months, tol=1e-10, max_rate=5.0, max_iter=100):
+    """Annual rate at which `monthly` for `months` grows to `goal`.
+
+    Runs Newton's method on log(value) against the monthly rate, falling back
+    to bisection whenever a step would leave the current bracket, until the
+    annual rate moves by less than `tol`. Returns 0.0 if contributions alone
+    reach the goal; raises ValueError if even `max_rate` is not enough.
+    """
+    if months <= 0 or monthly <= 0:
+        raise ValueError("monthly and months must be positive")
+    if monthly * months >= goal:
+        return 0.0
+
+    log_goal = math.log(goal)
+
+    def log_excess(r):
+        growth = (1 + r) ** months
+        value = monthly * (growth - 1) / r
+        slope = monthly * (months * r * growth / (1 + r) - (growth - 1)) / r ** 2
+        return math.log(value) - log_goal, slope / value
+
+    # Bracket the root by doubling up from 1% a year
+    low, high = 0.0, 0.01 / 12
+    while log_excess(high)[0] < 0:
+        low, high = high, high * 2
+        if high > max_rate / 12:
+            if log_excess(max_rate / 12)[0] < 0:
+                raise ValueError(f"goal is not reachable at rates up to {max_rate:.0%}")
+            high = max_rate / 12
+            break
+
+    r = (low + high) / 2 if low else high / 2
+    for _ in range(max_iter):
+        value, slope = log_excess(r)
+        if value > 0:
+            high = r
+        else:
+            low = r
+        step = r - value / slope
+        r_next = step if low < step < high else (low + high) / 2
+        converged = abs(r_next - r) * 12 < tol
+        r = r_next
+        if converged:
+            break
+    return r * 12
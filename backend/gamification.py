@@ -2,7 +2,16 @@
 Gamification Engine — XP, Levels, and Badge System for FinMentor.
 """
 
-from backend.database import get_streak, get_badges, award_badge, get_total_savings, get_quiz_scores
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+from backend.cache import LRUCache
+from backend.database import (
+    get_streak, get_badges, award_badges, get_gamification_snapshot, get_xp_leaderboard,
+    get_generation,
+)
 
 # ── Level System ──────────────────────────────────────
 
@@ -19,26 +28,16 @@ LEVEL_THRESHOLDS = [
     (3500, "Legend 🏆",         10),
 ]
 
+_LEVEL_XP = [threshold for threshold, _, _ in LEVEL_THRESHOLDS]
+
 def get_level(total_xp):
     """Return (level_number, level_name, xp_for_next_level, xp_progress_in_level)."""
-    current_level = LEVEL_THRESHOLDS[0]
-    next_threshold = None
-
-    for i, (threshold, name, level_num) in enumerate(LEVEL_THRESHOLDS):
-        if total_xp >= threshold:
-            current_level = (threshold, name, level_num)
-            if i + 1 < len(LEVEL_THRESHOLDS):
-                next_threshold = LEVEL_THRESHOLDS[i + 1][0]
-            else:
-                next_threshold = None
-        else:
-            break
-
-    level_num = current_level[2]
-    level_name = current_level[1]
-    current_threshold = current_level[0]
-
-    if next_threshold:
+    index = bisect_right(_LEVEL_XP, total_xp) - 1
+    current_threshold, level_name, level_num = LEVEL_THRESHOLDS[max(index, 0)]
+
+    # Below the first threshold is treated like max level: no next level to progress to
+    if 0 <= index < len(LEVEL_THRESHOLDS) - 1:
+        next_threshold = LEVEL_THRESHOLDS[index + 1][0]
         xp_in_level = total_xp - current_threshold
         xp_needed = next_threshold - current_threshold
         progress = xp_in_level / xp_needed
@@ -56,6 +55,60 @@ def get_level(total_xp):
         "total_xp": total_xp,
     }
 
+@lru_cache(maxsize=None)
+def _level_arrays():
+    # Built on first use so importing this module (every page does) skips numpy
+    import numpy as np
+
+    xp = np.array(_LEVEL_XP)
+    numbers = np.array([level_num for _, _, level_num in LEVEL_THRESHOLDS])
+    names = np.array([name for _, name, _ in LEVEL_THRESHOLDS], dtype=object)
+    return xp, numbers, names, np.append(xp[1:], xp[-1])
+
+def get_levels(xp_values):
+    """Vectorized get_level for a whole array/Series of XP totals.
+
+    Returns a dict of NumPy arrays with the same keys as get_level(), so
+    pd.DataFrame(get_levels(df["total_xp"]), index=df.index) levels a column in one call.
+    """
+    import numpy as np
+
+    level_xp, level_numbers, level_names, next_level_xp = _level_arrays()
+    total_xp = np.asarray(xp_values)
+    index = np.searchsorted(level_xp, total_xp, side="right") - 1
+    at_cap = (index < 0) | (index == len(LEVEL_THRESHOLDS) - 1)
+    index = np.maximum(index, 0)
+
+    current_threshold = level_xp[index]
+    xp_in_level = total_xp - current_threshold
+    xp_needed = np.where(at_cap, 0, next_level_xp[index] - current_threshold)
+    progress = np.where(at_cap, 1.0, xp_in_level / np.where(at_cap, 1, xp_needed))
+
+    return {
+        "level": level_numbers[index],
+        "name": level_names[index],
+        "xp_in_level": xp_in_level,
+        "xp_needed": xp_needed,
+        "progress": np.minimum(progress, 1.0),
+        "total_xp": total_xp,
+    }
+
+def get_leaderboard(limit=10):
+    """Top users by XP with their levels. limit=None levels every saving_streaks row."""
+    rows = get_xp_leaderboard(limit)
+    if not rows:
+        return []
+    levels = get_levels([xp for _, xp in rows])
+    return [
+        {
+            "username": username,
+            "total_xp": xp,
+            "level": int(levels["level"][i]),
+            "name": levels["name"][i],
+        }
+        for i, (username, xp) in enumerate(rows)
+    ]
+
 # ── Badge Definitions ────────────────────────────────
 
 BADGE_DEFINITIONS = {
@@ -73,66 +126,93 @@ BADGE_DEFINITIONS = {
     "₹50K Saved 💎":        {"description": "Total savings reached ₹50,000", "condition": "savings >= 50000"},
 }
 
-def check_and_award_badges(username):
-    """Check all badge conditions and award any newly earned badges. Returns list of newly earned badge names."""
-    streak_data = get_streak(username)
-    current_streak = streak_data["current_streak"]
-    longest_streak = streak_data["longest_streak"]
-    best_streak = max(current_streak, longest_streak)
+# ── Badge Rules ──────────────────────────────────────
+# Conditions are parsed once at import into threshold rules, grouped by metric
+# and sorted by threshold, so a check is one bisect per metric. New tiers only
+# need a BADGE_DEFINITIONS entry of the form "<metric> >= <number>".
 
-    total_savings = get_total_savings(username)
-    quiz_scores = get_quiz_scores(username)
-    num_quizzes = len(quiz_scores)
+BadgeRule = namedtuple("BadgeRule", ["metric", "threshold", "badge_name", "order"])
 
-    existing_badges = {b["name"] for b in get_badges(username)}
-    newly_earned = []
+_CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*>=\s*(-?\d+(?:\.\d+)?)\s*$")
 
-    for badge_name, badge_info in BADGE_DEFINITIONS.items():
-        if badge_name in existing_badges:
+def compile_badge_rules(definitions):
+    """Parse definitions into {metric: (sorted_thresholds, rules)}. "manual" badges are skipped."""
+    grouped = {}
+    for order, (badge_name, badge_info) in enumerate(definitions.items()):
+        condition = badge_info["condition"]
+        if condition == "manual":
+            continue
+        match = _CONDITION_PATTERN.match(condition)
+        if not match:
+            raise ValueError(f"Unsupported condition for badge {badge_name!r}: {condition!r}")
+        metric, threshold = match.group(1), float(match.group(2))
+        grouped.setdefault(metric, []).append(BadgeRule(metric, threshold, badge_name, order))
+
+    compiled = {}
+    for metric, rules in grouped.items():
+        rules.sort(key=lambda rule: rule.threshold)
+        compiled[metric] = ([rule.threshold for rule in rules], rules)
+    return compiled
+
+BADGE_RULES = compile_badge_rules(BADGE_DEFINITIONS)
+
+def evaluate_badge_rules(metrics, existing_badges=(), rules=None):
+    """Return every badge whose threshold `metrics` has crossed and that isn't already earned.
+
+    Names come back in BADGE_DEFINITIONS order. Metrics missing from `metrics` are skipped.
+    """
+    if rules is None:
+        rules = BADGE_RULES
+    earned = []
+    for metric, (thresholds, metric_rules) in rules.items():
+        value = metrics.get(metric)
+        if value is None:
             continue
+        crossed = bisect_right(thresholds, value)
+        earned.extend(rule for rule in metric_rules[:crossed] if rule.badge_name not in existing_badges)
+    earned.sort(key=lambda rule: rule.order)
+    return [rule.badge_name for rule in earned]
 
-        condition = badge_info["condition"]
-        earned = False
-
-        if condition == "streak >= 1" and best_streak >= 1:
-            earned = True
-        elif condition == "streak >= 3" and best_streak >= 3:
-            earned = True
-        elif condition == "streak >= 7" and best_streak >= 7:
-            earned = True
-        elif condition == "streak >= 14" and best_streak >= 14:
-            earned = True
-        elif condition == "streak >= 30" and best_streak >= 30:
-            earned = True
-        elif condition == "quizzes >= 1" and num_quizzes >= 1:
-            earned = True
-        elif condition == "quizzes >= 5" and num_quizzes >= 5:
-            earned = True
-        elif condition == "savings >= 1000" and total_savings >= 1000:
-            earned = True
-        elif condition == "savings >= 5000" and total_savings >= 5000:
-            earned = True
-        elif condition == "savings >= 10000" and total_savings >= 10000:
-            earned = True
-        elif condition == "savings >= 50000" and total_savings >= 50000:
-            earned = True
-
-        if earned:
-            award_badge(username, badge_name)
-            newly_earned.append(badge_name)
+def check_and_award_badges(username):
+    """Check all badge conditions and award any newly earned badges. Returns list of newly earned badge names."""
+    snapshot = get_gamification_snapshot(username)
+    metrics = {
+        "streak": max(snapshot["current_streak"], snapshot["longest_streak"]),
+        "quizzes": snapshot["quiz_count"],
+        "savings": snapshot["total_savings"],
+    }
 
+    newly_earned = evaluate_badge_rules(metrics, snapshot["badges"])
+    award_badges(username, newly_earned)
     return newly_earned
 
+SUMMARY_CACHE_SIZE = 2048
+_summary_cache = LRUCache(maxsize=SUMMARY_CACHE_SIZE)
+
 def get_gamification_summary(username):
-    """Get complete gamification summary for a user."""
+    """Get complete gamification summary for a user.
+
+    Cached per user until the next write to their streak, XP, badges or
+    transactions; treat the returned dict as read-only.
+    """
+    key = (username, get_generation(username))
+    summary = _summary_cache.get(key)
+    if summary is not None:
+        return summary
+
     streak_data = get_streak(username)
     level_data = get_level(streak_data["total_xp"])
     badges = get_badges(username)
 
-    return {
+    summary = {
         "streak": streak_data,
         "level": level_data,
         "badges": badges,
         "badge_count": len(badges),
         "total_badges": len(BADGE_DEFINITIONS),
     }
+    _summary_cache.set(key, summary)
+    return summary
+
+def get_summary_cache_stats():
+    return _summary_cache.stats()
@@ -0,0 +1,325 @@
+"""
+Importer — Streaming bulk import of bank statements (CSV or OFX) into the ledger.
+
+Files are parsed line by line and written in batches: each batch is one
+transaction with a single executemany, one aggregate and rollup update, one
+nudge invalidation and one streak event for the worker in backend.events, so
+memory stays bounded by the batch size and years of history load in seconds. Every imported row carries a content hash, and the unique
+(username, content_hash) index makes re-importing a file, or an overlapping
+statement, skip rows that are already in the ledger.
+"""
+
+import csv
+import hashlib
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+from backend.database import (
+    get_connection, bump_generation, INCREMENTAL_STREAK_DAYS,
+    _UPSERT_AGGREGATES_SQL, _apply_rollups_since, _discard_stored_nudges, _enqueue_event, _notify_outbox,
+)
+
+BATCH_SIZE = 20_000
+IMPORT_CACHE_KIB = 131_072   # page cache for the import connection while it runs
+MAX_REPORTED_ERRORS = 10
+DEFAULT_CATEGORY = "Other"
+
+ImportRow = namedtuple("ImportRow", "date amount type category description ref")
+
+# ── Field Parsing ─────────────────────────────────────
+
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d %b %Y", "%Y%m%d")
+_INCOME_WORDS = ("inc", "cr", "credit", "deposit")
+_EXPENSE_WORDS = ("exp", "dr", "debit", "withdrawal")
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Statement date → the ledger's 'YYYY-MM-DD HH:MM:SS' form.
+
+    Memoized: a statement has far fewer distinct dates than rows.
+    """
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+def parse_amount(value):
+    """'₹1,250.50', '(300)' or '-300' → float; parentheses mean negative."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    value = value.strip()
+    negative = value.startswith("(") and value.endswith(")")
+    number = float(re.sub(r"[^\d.\-]", "", value))
+    return -number if negative else number
+
+def _parse_type(value):
+    value = value.strip().lower()
+    if value.startswith(_INCOME_WORDS):
+        return "Income"
+    if value.startswith(_EXPENSE_WORDS):
+        return "Expense"
+    raise ValueError(f"unrecognised type {value!r}")
+
+# ── Readers ───────────────────────────────────────────
+# Each reader yields ImportRow or, for a line it cannot use, the ValueError.
+
+def _column(header, *names):
+    for name in names:
+        if name in header:
+            return header[name]
+    return None
+
+def read_csv(lines):
+    """Rows from a CSV statement with a header line.
+
+    Needs a date column and either an amount column (with a type column, or a
+    sign: negative = expense) or separate debit/credit (withdrawal/deposit)
+    columns. Category and description columns are optional. A debit/credit
+    row is a debit when its debit amount is non-zero, so exports that fill
+    the unused column with 0.00 work too.
+    """
+    reader = csv.reader(lines)
+    header = {name.strip().lower(): i for i, name in enumerate(next(reader, []))}
+    date_col = _column(header, "date", "transaction date", "txn date", "value date", "posted")
+    if date_col is None:
+        date_col = next((i for name, i in header.items() if "date" in name), None)
+    amount_col = _column(header, "amount", "amount (inr)", "value")
+    type_col = _column(header, "type", "dr/cr", "cr/dr")
+    debit_col = _column(header, "debit", "withdrawal", "withdrawal amount")
+    credit_col = _column(header, "credit", "deposit", "deposit amount")
+    category_col = _column(header, "category")
+    description_col = _column(header, "description", "narration", "details", "memo")
+    if date_col is None or (amount_col is None and debit_col is None and credit_col is None):
+        raise ValueError("CSV needs a date column and an amount or debit/credit columns")
+
+    for record in reader:
+        if not record or not any(field.strip() for field in record):
+            continue
+        try:
+            date = parse_date(record[date_col])
+            if amount_col is not None:
+                amount = parse_amount(record[amount_col])
+                t_type = _parse_type(record[type_col]) if type_col is not None else (
+                    "Expense" if amount < 0 else "Income")
+            else:
+                debit = record[debit_col].strip() if debit_col is not None else ""
+                credit = record[credit_col].strip() if credit_col is not None else ""
+                amount = parse_amount(debit) if debit else 0.0
+                t_type = "Expense"
+                if not amount:
+                    amount = parse_amount(credit) if credit else 0.0
+                    t_type = "Income"
+                if not amount:
+                    raise ValueError("no debit or credit amount")
+            category = record[category_col].strip() if category_col is not None else ""
+            description = record[description_col].strip() if description_col is not None else ""
+            yield ImportRow(date, abs(amount), t_type, category or DEFAULT_CATEGORY, description, None)
+        except (ValueError, IndexError) as e:
+            yield ValueError(f"line {reader.line_num}: {e}")
+
+_OFX_TAG = re.compile(r"<(/?)(\w+)>([^<\r\n]*)")
+
+def read_ofx(lines):
+    """Rows from the <STMTTRN> blocks of an OFX/QFX statement (SGML or XML flavour).
+
+    Tags are scanned one at a time, so files written on a single line work too.
+    """
+    fields = None
+    for line in lines:
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag != "STMTTRN":
+                if fields is not None and not closing and value.strip():
+                    fields[tag] = value.strip()
+                continue
+            if not closing:
+                fields = {}
+                continue
+            if fields is None:
+                continue
+            try:
+                amount = parse_amount(fields["TRNAMT"])
+                yield ImportRow(
+                    parse_date(fields["DTPOSTED"][:8]), abs(amount),
+                    "Expense" if amount < 0 else "Income", DEFAULT_CATEGORY,
+                    fields.get("NAME") or fields.get("MEMO", ""), fields.get("FITID"),
+                )
+            except (KeyError, ValueError) as e:
+                yield ValueError(f"transaction {fields.get('FITID', '?')}: {e}")
+            fields = None
+
+# ── Content Hashes ────────────────────────────────────
+
+def _content_hash(key):
+    # 64-bit signed integer: a compact index key, and collisions within one
+    # user's ledger are vanishingly unlikely at any realistic size
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+
+def _hashed(rows):
+    """Attach a content hash to each row; pass errors through.
+
+    Rows with a bank reference (OFX FITID) hash on it. Otherwise the hash
+    covers the row's fields plus its occurrence number among identical rows of
+    the same day, so two genuine ₹50 coffees on one date both import while a
+    re-import of the same file matches both. Statements are in date order, so
+    counts are kept for the current day only and memory stays flat.
+    """
+    day, seen = None, {}
+    for row in rows:
+        if isinstance(row, Exception):
+            yield row
+            continue
+        if row.ref:
+            key = f"ref\x1f{row.ref}"
+        else:
+            if row.date != day:
+                day, seen = row.date, {}
+            fields = f"{row.date}\x1f{row.amount:.2f}\x1f{row.type}\x1f{row.category}\x1f{row.description}"
+            seen[fields] = seen.get(fields, 0) + 1
+            key = f"{fields}\x1f{seen[fields]}"
+        yield row, _content_hash(key)
+
+# ── Import ────────────────────────────────────────────
+
+_INSERT_IMPORTED_SQL = """
+    INSERT OR IGNORE INTO transactions (username, amount, type, category, date, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_BATCH_TOTALS_SQL = """
+    SELECT COALESCE(SUM(CASE WHEN type='Income' THEN amount END), 0),
+           COALESCE(SUM(CASE WHEN type='Expense' THEN amount END), 0),
+           COUNT(*), MIN(date), MAX(date)
+    FROM transactions
+    WHERE id > :after AND username = :u
+"""
+
+_BATCH_SAVING_DAYS_SQL = """
+    SELECT DISTINCT substr(date, 1, 10)
+    FROM transactions
+    WHERE id > :after AND username = :u AND (type='Income' OR category='Investment')
+"""
+
+def _write_batch(conn, username, batch, saving_days):
+    """Insert one batch in a single transaction. Returns (inserted, saving days so far).
+
+    `saving_days` are the days queued by earlier batches, or None once there
+    are too many to credit one by one. The batch's own saving days are queued
+    for the event worker in the same commit as its rows, as days or, past
+    INCREMENTAL_STREAK_DAYS, as a streak rebuild.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+        conn.executemany(_INSERT_IMPORTED_SQL, batch)
+        # Rows that survived the dedupe are exactly the ids past last_id
+        params = {"after": last_id, "u": username}
+        income, expense, count, first, last = conn.execute(_BATCH_TOTALS_SQL, params).fetchone()
+        days = [row[0] for row in conn.execute(_BATCH_SAVING_DAYS_SQL, params)]
+        if count:
+            cursor = conn.cursor()
+            cursor.execute(_UPSERT_AGGREGATES_SQL, (username, income, expense, count, first, last))
+            _apply_rollups_since(cursor, username, last_id)
+            _discard_stored_nudges(cursor, username)
+            if saving_days is not None:
+                saving_days = saving_days | set(days)
+                if len(saving_days) > INCREMENTAL_STREAK_DAYS:
+                    saving_days = None
+            if days and saving_days is None:
+                _enqueue_event(cursor, username, "rebuild_streak")
+            elif days:
+                _enqueue_event(cursor, username, "saving_days", {"days": sorted(days)})
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    if days:
+        _notify_outbox()
+    return count, saving_days
+
+def import_transactions(username, rows, batch_size=BATCH_SIZE):
+    """Import ImportRow records (or reader output) for one user.
+
+    Returns counts of rows read, inserted, skipped as duplicates and rejected,
+    plus the first few parse errors.
+    """
+    started = time.perf_counter()
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "rejected": 0, "batches": 0, "errors": []}
+    saving_days = set()
+    batch = []
+
+    with get_connection() as conn:
+        # Index pages for a large import don't fit the default cache; give this
+        # connection a bigger one while it runs, then hand it back as it was
+        cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+        conn.execute(f"PRAGMA cache_size=-{IMPORT_CACHE_KIB}")
+
+        def flush():
+            nonlocal saving_days
+            inserted, saving_days = _write_batch(conn, username, batch, saving_days)
+            stats["inserted"] += inserted
+            stats["duplicates"] += len(batch) - inserted
+            stats["batches"] += 1
+            batch.clear()
+
+        try:
+            for item in _hashed(rows):
+                if isinstance(item, Exception):
+                    stats["rejected"] += 1
+                    if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                        stats["errors"].append(str(item))
+                    continue
+                row, content_hash = item
+                stats["read"] += 1
+                batch.append((username, row.amount, row.type, row.category, row.date, content_hash))
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            conn.execute(f"PRAGMA cache_size={int(cache_size)}")
+
+    if stats["inserted"]:
+        bump_generation(username)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def read_statement(lines, fmt="csv"):
+    return read_ofx(lines) if fmt == "ofx" else read_csv(lines)
+
+def import_file(username, path, fmt=None, batch_size=BATCH_SIZE):
+    """Import a statement file; the format defaults from the extension (.ofx/.qfx, else CSV)."""
+    fmt = fmt or ("ofx" if path.lower().endswith((".ofx", ".qfx")) else "csv")
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        return import_transactions(username, read_statement(f, fmt), batch_size)
+
+
+if __name__ == "__main__":
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Import a bank statement into a user's ledger")
+    parser.add_argument("username")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "ofx"))
+    parser.add_argument("--db", help="SQLite database file")
+    args = parser.parse_args()
+
+    db = importlib.import_module("backend.database")
+    if args.db:
+        db.DB_NAME = args.db
+    db.create_tables()
+    result = import_file(args.username, args.path, args.format)
+    importlib.import_module("backend.events").drain()
+    for error in result.pop("errors"):
+        print(f"REJECTED  {error}")
+    print(", ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+                    for key, value in result.items()))
@@ -2,9 +2,31 @@
 Behavioral Nudges — Smart contextual alerts based on user financial behavior.
 """
 
-from backend.database import get_streak, get_transactions, get_total_savings
-from datetime import datetime, timedelta
-import pandas as pd
+from backend.database import get_streak, get_user_aggregates, get_connection, _audited
+from backend.analytics import weekly_expenses, nudge_inputs_for_all_users
+from datetime import datetime
+
+# ── Rule Parameters ───────────────────────────────────
+# Shared by the live per-user path (get_nudges) and the batch precompute
+# (generate_all_nudges) so both produce identical messages.
+
+STREAK_MILESTONES = [3, 7, 14, 30]
+SAVINGS_MILESTONES = [500, 1000, 2000, 5000, 10000, 25000, 50000]
+SPIKE_RATIO = 1.3
+LOW_SAVING_RATE = 10
+HIGH_SAVING_RATE = 30
+
+MESSAGES = {
+    "streak_at_risk": "🔥 Don't break your {streak}-day streak! Log your savings today.",
+    "welcome_back": "👋 Welcome back! Start a new saving streak today — every day counts!",
+    "milestone_approaching": "⚡ You're just 1 day away from a {milestone}-day streak! Keep going!",
+    "milestone_reached": "🎉 Amazing! You've reached a {streak}-day saving streak!",
+    "spending_spike": "📉 Your spending this week is up {increase:.0f}% from last week. Consider reviewing your expenses.",
+    "low_saving_rate": "💡 Your saving rate is below 10%. Try the 50-30-20 rule: 50% needs, 30% wants, 20% savings.",
+    "high_saving_rate": "🌟 Great job! You're saving {rate:.0f}% of your income. Keep it up!",
+    "savings_milestone": "🎯 You're almost at ₹{milestone:,}! Just ₹{remaining:,.0f} more to go!",
+    "first_time": "🚀 Welcome to FinMentor! Start by logging your income in the Daily Tracker to begin your saving journey.",
+}
 
 
 def get_nudges(username):
@@ -25,83 +47,230 @@ def get_nudges(username):
         if days_since == 1 and current_streak >= 2:
             nudges.append({
                 "type": "warning",
-                "message": f"🔥 Don't break your {current_streak}-day streak! Log your savings today."
+                "message": MESSAGES["streak_at_risk"].format(streak=current_streak)
             })
         elif days_since > 1:
             nudges.append({
                 "type": "info",
-                "message": "👋 Welcome back! Start a new saving streak today — every day counts!"
+                "message": MESSAGES["welcome_back"]
             })
 
     # Streak milestone approaching
-    milestones = [3, 7, 14, 30]
-    for m in milestones:
+    for m in STREAK_MILESTONES:
         if current_streak == m - 1:
             nudges.append({
                 "type": "success",
-                "message": f"⚡ You're just 1 day away from a {m}-day streak! Keep going!"
+                "message": MESSAGES["milestone_approaching"].format(milestone=m)
             })
             break
 
     # Streak celebration
-    if current_streak in milestones:
+    if current_streak in STREAK_MILESTONES:
         nudges.append({
             "type": "success",
-            "message": f"🎉 Amazing! You've reached a {current_streak}-day saving streak!"
+            "message": MESSAGES["milestone_reached"].format(streak=current_streak)
         })
 
     # ── Spending-based nudges ──
-    data = get_transactions(username)
-    if data:
-        df = pd.DataFrame(data, columns=["Amount", "Type", "Category", "Date"])
-        df["Date"] = pd.to_datetime(df["Date"])
-
+    # Bounded reads only: running totals plus the last two weeks of expenses
+    totals = get_user_aggregates(username)
+    has_data = totals["txn_count"] > 0
+    if has_data:
         # Check for spending spikes in the last 7 days
-        week_ago = datetime.now() - timedelta(days=7)
-        two_weeks_ago = datetime.now() - timedelta(days=14)
+        recent_expenses, previous_expenses = weekly_expenses(username)
 
-        recent_expenses = df[(df["Type"] == "Expense") & (df["Date"] >= week_ago)]["Amount"].sum()
-        previous_expenses = df[(df["Type"] == "Expense") & (df["Date"] >= two_weeks_ago) & (df["Date"] < week_ago)]["Amount"].sum()
-
-        if previous_expenses > 0 and recent_expenses > previous_expenses * 1.3:
+        if previous_expenses > 0 and recent_expenses > previous_expenses * SPIKE_RATIO:
             increase = ((recent_expenses - previous_expenses) / previous_expenses) * 100
             nudges.append({
                 "type": "warning",
-                "message": f"📉 Your spending this week is up {increase:.0f}% from last week. Consider reviewing your expenses."
+                "message": MESSAGES["spending_spike"].format(increase=increase)
             })
 
         # Check if saving rate is low
-        income = df[df["Type"] == "Income"]["Amount"].sum()
-        expense = df[df["Type"] == "Expense"]["Amount"].sum()
+        income = totals["income"]
         if income > 0:
-            saving_rate = (income - expense) / income * 100
-            if saving_rate < 10:
+            saving_rate = (income - totals["expense"]) / income * 100
+            if saving_rate < LOW_SAVING_RATE:
                 nudges.append({
                     "type": "warning",
-                    "message": "💡 Your saving rate is below 10%. Try the 50-30-20 rule: 50% needs, 30% wants, 20% savings."
+                    "message": MESSAGES["low_saving_rate"]
                 })
-            elif saving_rate >= 30:
+            elif saving_rate >= HIGH_SAVING_RATE:
                 nudges.append({
                     "type": "success",
-                    "message": f"🌟 Great job! You're saving {saving_rate:.0f}% of your income. Keep it up!"
+                    "message": MESSAGES["high_saving_rate"].format(rate=saving_rate)
                 })
 
     # ── Savings milestones ──
-    total_savings = get_total_savings(username)
-    savings_milestones = [500, 1000, 2000, 5000, 10000, 25000, 50000]
-    for m in savings_milestones:
+    total_savings = totals["income"] - totals["expense"]
+    for m in SAVINGS_MILESTONES:
         if total_savings >= m * 0.9 and total_savings < m:
             nudges.append({
                 "type": "success",
-                "message": f"🎯 You're almost at ₹{m:,}! Just ₹{m - total_savings:,.0f} more to go!"
+                "message": MESSAGES["savings_milestone"].format(milestone=m, remaining=m - total_savings)
             })
             break
 
     # ── First-time user nudge ──
-    if not data:
+    if not has_data:
         nudges.append({
             "type": "info",
-            "message": "🚀 Welcome to FinMentor! Start by logging your income in the Daily Tracker to begin your saving journey."
+            "message": MESSAGES["first_time"]
         })
 
     return nudges
+
+
+# ── Batch Precompute ──────────────────────────────────
+# generate_all_nudges() evaluates every rule for every user with one SQL pass
+# and vectorized pandas masks, then replaces the contents of the nudges table.
+# The inputs are read without holding the write lock, so each stored row is
+# stamped with the user's txn_count and streak it was built from. Rows are
+# only trusted on the day they were generated and while those stamps still
+# match user_aggregates and saving_streaks; writes to a user's ledger or
+# streak also delete that user's rows (see backend.database).
+
+def _rule_rows(frame, mask, position, nudge_type, message):
+    """Rows for one rule. `message` is a constant string or a function of the fired rows."""
+    import pandas as pd
+
+    fired = frame[mask]
+    return pd.DataFrame({
+        "username": fired["username"].to_numpy(),
+        "position": position,
+        "type": nudge_type,
+        "message": message if isinstance(message, str) else message(fired),
+    })
+
+
+def _format_each(template, **columns):
+    """Format `template` once per row from equally long column sequences."""
+    names = list(columns)
+    return [template.format(**dict(zip(names, values))) for values in zip(*columns.values())]
+
+
+def evaluate_nudge_rules(frame, now=None):
+    """Vectorized nudge rules over a per-user metrics frame.
+
+    `frame` needs username, current_streak, last_saving_date, txn_count, income,
+    expense, recent_expenses and previous_expenses columns (see
+    analytics.nudge_inputs_for_all_users). Returns username, position, type and
+    message columns, ordered the way get_nudges() would list them.
+    """
+    # pandas is only needed by the batch path; the live path stays light
+    import pandas as pd
+
+    now = now or datetime.now()
+    today = now.strftime("%Y-%m-%d")
+
+    streak = frame["current_streak"]
+    last_date = pd.to_datetime(frame["last_saving_date"], format="%Y-%m-%d", errors="coerce")
+    days_since = (pd.Timestamp(now.date()) - last_date).dt.days
+    stale = last_date.notna() & (frame["last_saving_date"] != today)
+
+    has_data = frame["txn_count"] > 0
+    income = frame["income"]
+    total_savings = income - frame["expense"]
+    saving_rate = (total_savings / income.where(income > 0)) * 100
+    recent, previous = frame["recent_expenses"], frame["previous_expenses"]
+    spike = has_data & (previous > 0) & (recent > previous * SPIKE_RATIO)
+
+    frame = frame.assign(
+        saving_rate=saving_rate,
+        total_savings=total_savings,
+        increase=(recent - previous) / previous.where(previous > 0) * 100,
+    )
+
+    parts = [
+        _rule_rows(frame, stale & (days_since == 1) & (streak >= 2), 0, "warning",
+                   lambda f: _format_each(MESSAGES["streak_at_risk"], streak=f["current_streak"].tolist())),
+        _rule_rows(frame, stale & (days_since > 1), 0, "info", MESSAGES["welcome_back"]),
+        _rule_rows(frame, streak.isin([m - 1 for m in STREAK_MILESTONES]), 1, "success",
+                   lambda f: _format_each(MESSAGES["milestone_approaching"],
+                                          milestone=(f["current_streak"] + 1).tolist())),
+        _rule_rows(frame, streak.isin(STREAK_MILESTONES), 2, "success",
+                   lambda f: _format_each(MESSAGES["milestone_reached"], streak=f["current_streak"].tolist())),
+        _rule_rows(frame, spike, 3, "warning",
+                   lambda f: _format_each(MESSAGES["spending_spike"], increase=f["increase"].tolist())),
+        _rule_rows(frame, has_data & (saving_rate < LOW_SAVING_RATE), 4, "warning", MESSAGES["low_saving_rate"]),
+        _rule_rows(frame, has_data & (saving_rate >= HIGH_SAVING_RATE), 4, "success",
+                   lambda f: _format_each(MESSAGES["high_saving_rate"], rate=f["saving_rate"].tolist())),
+    ]
+
+    # Only the first savings milestone in range fires, as in get_nudges()
+    matched = pd.Series(False, index=frame.index)
+    for m in SAVINGS_MILESTONES:
+        in_range = (total_savings >= m * 0.9) & (total_savings < m) & ~matched
+        parts.append(_rule_rows(frame, in_range, 5, "success",
+                                lambda f, m=m: _format_each(MESSAGES["savings_milestone"], milestone=[m] * len(f),
+                                                            remaining=(m - f["total_savings"]).tolist())))
+        matched |= in_range
+
+    parts.append(_rule_rows(frame, ~has_data, 6, "info", MESSAGES["first_time"]))
+
+    result = pd.concat(parts, ignore_index=True)
+    return result.sort_values(["username", "position"], kind="stable", ignore_index=True)
+
+
+def generate_all_nudges(now=None):
+    """Precompute nudges for every user and replace the nudges table. Returns rows written."""
+    now = now or datetime.now()
+    generated_on = now.strftime("%Y-%m-%d")
+    inputs = nudge_inputs_for_all_users(now)
+    stamps = inputs.set_index("username")[["txn_count", "current_streak", "last_saving_date"]]
+    nudges = evaluate_nudge_rules(inputs, now).join(stamps, on="username")
+    rows = list(zip(
+        nudges["username"].tolist(), nudges["position"].astype(int).tolist(),
+        nudges["type"].tolist(), nudges["message"].tolist(), [generated_on] * len(nudges),
+        nudges["txn_count"].astype(int).tolist(), nudges["current_streak"].astype(int).tolist(),
+        nudges["last_saving_date"].astype(object).where(nudges["last_saving_date"].notna(), None).tolist(),
+    ))
+    # Only the swap holds the write lock; the evaluation above can take seconds
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM nudges")
+            conn.executemany("""
+                INSERT INTO nudges (username, position, type, message, generated_on,
+                                    txn_count, current_streak, last_saving_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+    return len(nudges)
+
+
+_LOAD_NUDGES_SQL = _audited("load_nudges", """
+    SELECT n.type, n.message, n.generated_on,
+           n.txn_count = COALESCE(a.txn_count, 0)
+               AND n.current_streak = COALESCE(s.current_streak, 0)
+               AND n.last_saving_date IS s.last_saving_date AS current
+    FROM nudges AS n
+    LEFT JOIN user_aggregates AS a ON a.username = n.username
+    LEFT JOIN saving_streaks AS s ON s.username = n.username
+    WHERE n.username=?
+    ORDER BY n.position, n.id
+""")
+
+def load_nudges(username):
+    """Today's precomputed nudges for a user, falling back to get_nudges() when none are stored.
+
+    Stored rows are ignored once the user's ledger or streak has moved on
+    since they were computed.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(_LOAD_NUDGES_SQL, (username,)).fetchall()
+    today = datetime.now().strftime("%Y-%m-%d")
+    if rows and rows[0]["generated_on"] == today and rows[0]["current"]:
+        return [{"type": row["type"], "message": row["message"]} for row in rows]
+    return get_nudges(username)
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    written = generate_all_nudges()
+    print(f"{written} nudges generated in {time.perf_counter() - start:.2f} s")
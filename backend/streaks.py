@@ -0,0 +1,136 @@
+"""
+Streaks — Saving-streak engine: runs of consecutive saving days and their XP.
+
+A saving day is a calendar day with at least one income or investment entry,
+and a streak is a run of consecutive saving days. Each saving day earns
+BASE_XP plus STREAK_BONUS_XP per day of the run so far, so a run of n days is
+worth xp_for_run(n) however its days were logged: in order, back-dated or
+imported in bulk. Everything here is pure; backend.database keeps the stored
+runs and each user's totals in step with the ledger.
+"""
+
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+BASE_XP = 10
+STREAK_BONUS_XP = 2
+
+Run = namedtuple("Run", "start end length")
+StreakState = namedtuple("StreakState", "current_streak longest_streak last_saving_date streak_xp")
+
+EMPTY_STREAK = StreakState(0, 0, None, 0)
+
+def xp_for_run(length):
+    """XP for a run of `length` days (also works element-wise on numpy arrays)."""
+    return BASE_XP * length + STREAK_BONUS_XP * length * (length + 1) // 2
+
+# ── Days ──────────────────────────────────────────────
+
+def to_day(value):
+    """A date, datetime or ledger timestamp string → 'YYYY-MM-DD'."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, date):
+        return value.isoformat()
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+def shift_day(day, days):
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+def make_run(start, end):
+    return Run(start, end, (date.fromisoformat(end) - date.fromisoformat(start)).days + 1)
+
+# ── One Pass ──────────────────────────────────────────
+
+def saving_runs(days):
+    """Runs of consecutive days from 'YYYY-MM-DD' strings sorted ascending (repeats allowed)."""
+    runs = []
+    start = end = None
+    previous = None
+    for day in days:
+        ordinal = date.fromisoformat(day).toordinal()
+        if ordinal == previous:
+            continue
+        if previous is None or ordinal != previous + 1:
+            if start is not None:
+                runs.append(make_run(start, end))
+            start = day
+        end, previous = day, ordinal
+    if start is not None:
+        runs.append(make_run(start, end))
+    return runs
+
+def streak_state(runs):
+    """Current (the run ending on the last saving day) and longest streak, plus streak XP."""
+    if not runs:
+        return EMPTY_STREAK
+    return StreakState(
+        runs[-1].length,
+        max(run.length for run in runs),
+        runs[-1].end,
+        sum(xp_for_run(run.length) for run in runs),
+    )
+
+def compute_streak(days):
+    """Streak state for one user's sorted saving days."""
+    return streak_state(saving_runs(days))
+
+# ── Incremental ───────────────────────────────────────
+
+def join_runs(day, left=None, right=None):
+    """Add a new saving day between the run ending the day before (`left`) and
+    the run starting the day after (`right`), either of which may be None.
+
+    Returns the merged run and the XP it adds: days of `right` move further
+    into the streak, so they are worth more than before.
+    """
+    start = left.start if left else day
+    end = right.end if right else day
+    merged = make_run(start, end)
+    old_xp = (xp_for_run(left.length) if left else 0) + (xp_for_run(right.length) if right else 0)
+    return merged, xp_for_run(merged.length) - old_xp
+
+# ── Vectorized ────────────────────────────────────────
+
+def all_user_streaks(rows):
+    """Run-length streaks for many users at once.
+
+    `rows` are (username, day) pairs sorted by username, then day. Returns
+    (runs, states): (username, start, end) tuples and (username, *StreakState)
+    tuples, one per user with at least one saving day.
+    """
+    # numpy is only needed by the batch path
+    import numpy as np
+
+    if not rows:
+        return [], []
+    users = np.array([row[0] for row in rows], dtype=object)
+    days = [row[1] for row in rows]
+    ordinals = np.array(days, dtype="datetime64[D]").astype(np.int64)
+
+    first_of_user = np.ones(len(rows), dtype=bool)
+    first_of_user[1:] = users[1:] != users[:-1]
+    keep = first_of_user | (np.diff(ordinals, prepend=ordinals[0] - 2) != 0)
+    if not keep.all():   # rows grouped by day in SQL are already distinct
+        users, ordinals, first_of_user = users[keep], ordinals[keep], first_of_user[keep]
+        days = [day for day, kept in zip(days, keep.tolist()) if kept]
+
+    # A run starts at each user's first day and wherever a day is skipped
+    run_starts = np.flatnonzero(first_of_user | (np.diff(ordinals, prepend=ordinals[0] - 2) != 1))
+    run_ends = np.append(run_starts[1:], len(users)) - 1
+    lengths = run_ends - run_starts + 1
+    run_users = users[run_starts]
+    starts = [days[i] for i in run_starts.tolist()]
+    ends = [days[i] for i in run_ends.tolist()]
+    runs = list(zip(run_users.tolist(), starts, ends))
+
+    user_starts = np.flatnonzero(np.append(True, run_users[1:] != run_users[:-1]))
+    last_runs = np.append(user_starts[1:], len(run_users)) - 1
+    states = list(zip(
+        run_users[user_starts].tolist(),
+        lengths[last_runs].tolist(),
+        np.maximum.reduceat(lengths, user_starts).tolist(),
+        [ends[i] for i in last_runs.tolist()],
+        np.add.reduceat(xp_for_run(lengths), user_starts).tolist(),
+    ))
+    return runs, states
@@ -0,0 +1,45 @@
+"""
+Shared helpers for the benchmark scripts (run from the repo root, e.g.
+``python -m benchmarks.bench_badges``).
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from backend import database
+
+
+@contextmanager
+def temp_database():
+    """Point backend.database at a fresh, fully migrated SQLite file for the block."""
+    original = database.DB_NAME
+    with tempfile.TemporaryDirectory() as tmp:
+        database.close_all_connections()
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.create_tables()
+        try:
+            yield database.DB_NAME
+        finally:
+            database.close_all_connections()
+            database.DB_NAME = original
+
+
+def best_of(fn, repeat=5, number=1):
+    """Best wall-clock seconds per call over `repeat` runs of `number` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def report(title, rows):
+    """Print a small aligned table of (label, value) rows."""
+    print(f"\n{title}")
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label:<{width}}  {value}")
@@ -0,0 +1,71 @@
+"""
+Badge evaluation: checking every condition string on every call versus the
+precompiled, bisect-per-metric rule table, with hundreds of badge tiers.
+"""
+
+import random
+
+from backend.gamification import BADGE_DEFINITIONS, compile_badge_rules, evaluate_badge_rules
+from benchmarks._common import best_of, report
+
+
+def tiered_definitions(tiers_per_metric):
+    definitions = dict(BADGE_DEFINITIONS)
+    for metric, step in (("streak", 2), ("quizzes", 1), ("savings", 500)):
+        for tier in range(1, tiers_per_metric + 1):
+            definitions[f"{metric} tier {tier}"] = {
+                "description": "generated tier",
+                "condition": f"{metric} >= {tier * step}",
+            }
+    return definitions
+
+
+def chain_evaluate(definitions, metrics, existing):
+    """The old approach: walk every badge and test its condition each call."""
+    earned = []
+    for name, info in definitions.items():
+        if name in existing:
+            continue
+        condition = info["condition"]
+        if condition == "manual":
+            continue
+        metric, _, threshold = condition.split()
+        if metrics[metric] >= float(threshold):
+            earned.append(name)
+    return earned
+
+
+def main():
+    rng = random.Random(7)
+    rows = []
+    for tiers in (10, 100, 500):
+        definitions = tiered_definitions(tiers)
+        rules = compile_badge_rules(definitions)
+        samples = [
+            {"streak": rng.randint(0, tiers * 2), "quizzes": rng.randint(0, tiers),
+             "savings": rng.uniform(0, tiers * 500)}
+            for _ in range(200)
+        ]
+        for metrics in samples:
+            expected = chain_evaluate(definitions, metrics, set())
+            assert evaluate_badge_rules(metrics, set(), rules) == expected
+
+        # Typical steady state: everything crossed so far is already earned
+        existing = [set(chain_evaluate(definitions, metrics, set())) for metrics in samples]
+
+        def chain():
+            for metrics, owned in zip(samples, existing):
+                chain_evaluate(definitions, metrics, owned)
+
+        def compiled():
+            for metrics, owned in zip(samples, existing):
+                evaluate_badge_rules(metrics, owned, rules)
+
+        chain_us = best_of(chain) / len(samples) * 1e6
+        compiled_us = best_of(compiled) / len(samples) * 1e6
+        rows.append((f"{len(definitions)} badges", f"chain {chain_us:8.1f} us   compiled {compiled_us:8.1f} us"))
+    report("badge evaluation per check", rows)
+
+
+if __name__ == "__main__":
+    main()
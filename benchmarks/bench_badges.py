@@ -0,0 +1,90 @@
+"""
+Badge check: per-metric fan-out (one query per getter, one connection per award)
+versus the single-query snapshot with a batched award.
+"""
+
+from backend import database
+from backend.database import (
+    get_streak, get_total_savings, get_quiz_scores, get_badges, award_badge,
+    trace_statements,
+)
+from backend.events import drain, pop_new_badges
+from backend.gamification import BADGE_DEFINITIONS, check_and_award_badges
+from benchmarks._common import temp_database, best_of, report
+
+USERNAME = "bench_user"
+
+
+def fanout_inputs(username):
+    """The reads check_and_award_badges used to make before the snapshot query."""
+    streak = get_streak(username)
+    savings = get_total_savings(username)
+    quizzes = len(get_quiz_scores(username))
+    existing = {b["name"] for b in get_badges(username)}
+    return streak, savings, quizzes, existing
+
+
+def seed(username):
+    database.register_user(username, "bench")
+    for _ in range(200):
+        database.add_transaction(username, 500, "Income", "Salary")
+        database.add_transaction(username, 120, "Expense", "Food")
+    for _ in range(6):
+        database.save_quiz_score(username, "Budgeting Basics", 4, 5)
+    # Apply the queued streak updates, then forget the badges that pass awarded
+    # so the checks below start from none earned
+    drain()
+    pop_new_badges(username)
+    with database.get_connection() as conn:
+        conn.execute("DELETE FROM badges WHERE username=?", (username,))
+        conn.commit()
+
+
+def count_statements(statements, kind=None):
+    """Count traced statements; kind="COMMIT" counts only commits, None everything else."""
+    if kind:
+        return sum(1 for sql in statements if sql.lstrip().upper().startswith(kind))
+    return sum(1 for sql in statements if not sql.lstrip().upper().startswith(("BEGIN", "COMMIT")))
+
+
+def fanout_check(username):
+    """check_and_award_badges as it was: separate reads, one award call per badge."""
+    streak, savings, quizzes, existing = fanout_inputs(username)
+    best = max(streak["current_streak"], streak["longest_streak"])
+    metrics = {"streak": best, "quizzes": quizzes, "savings": savings}
+    earned = []
+    for name, info in BADGE_DEFINITIONS.items():
+        if name in existing or info["condition"] == "manual":
+            continue
+        metric, _, threshold = info["condition"].split()
+        if metrics[metric] >= int(threshold):
+            award_badge(username, name)
+            earned.append(name)
+    return earned
+
+
+def main():
+    with temp_database():
+        seed("fanout")
+        seed("snapshot")
+
+        with trace_statements() as fanout_sql:
+            fanout_earned = fanout_check("fanout")
+        with trace_statements() as snapshot_sql:
+            snapshot_earned = check_and_award_badges("snapshot")
+        assert fanout_earned == snapshot_earned, (fanout_earned, snapshot_earned)
+
+        rows = [
+            ("badges awarded on first check", len(snapshot_earned)),
+            ("fan-out statements (first check)", count_statements(fanout_sql)),
+            ("snapshot statements (first check)", count_statements(snapshot_sql)),
+            ("fan-out commits (first check)", count_statements(fanout_sql, "COMMIT")),
+            ("snapshot commits (first check)", count_statements(snapshot_sql, "COMMIT")),
+            ("fan-out repeat check (ms)", f"{best_of(lambda: fanout_check('fanout'), number=50) * 1e3:.3f}"),
+            ("snapshot repeat check (ms)", f"{best_of(lambda: check_and_award_badges('snapshot'), number=50) * 1e3:.3f}"),
+        ]
+        report("check_and_award_badges", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Batch nudge precompute for 100k users, checked against the live per-user
+get_nudges() on a sample of them.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from backend import database
+from backend.nudges import generate_all_nudges, get_nudges, load_nudges
+from benchmarks._common import temp_database, report
+
+USERS = 100_000
+
+
+def seed(users):
+    rng = random.Random(9)
+    now = datetime.now()
+    user_rows, streak_rows, txn_rows = [], [], []
+    for i in range(users):
+        name = f"user{i:06d}"
+        user_rows.append((name, "x"))
+        last = (now - timedelta(days=rng.choice([0, 1, 1, 2, 5]))).strftime("%Y-%m-%d") if rng.random() < 0.8 else None
+        streak_rows.append((name, rng.choice([0, 1, 2, 3, 6, 7, 13, 29, 30]), last, rng.randint(0, 3000)))
+        for _ in range(rng.randint(0, 6)):
+            txn_rows.append((
+                name,
+                round(rng.uniform(50, 3000), 2),
+                "Income" if rng.random() < 0.4 else "Expense",
+                "Food",
+                (now - timedelta(days=rng.uniform(0, 20))).strftime("%Y-%m-%d %H:%M:%S"),
+            ))
+    with database.get_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)", user_rows)
+        conn.executemany(
+            "INSERT INTO saving_streaks (username, current_streak, longest_streak, last_saving_date, total_xp) "
+            "VALUES (?, ?, 0, ?, ?)", streak_rows,
+        )
+        conn.executemany(
+            "INSERT INTO transactions (username, amount, type, category, date) VALUES (?, ?, ?, ?, ?)", txn_rows,
+        )
+        conn.commit()
+    database.rebuild_user_aggregates()
+    return len(txn_rows)
+
+
+def main():
+    with temp_database():
+        transactions = seed(USERS)
+
+        start = time.perf_counter()
+        written = generate_all_nudges()
+        batch_s = time.perf_counter() - start
+
+        sample = [f"user{i:06d}" for i in random.Random(1).sample(range(USERS), 500)]
+        for name in sample:
+            assert load_nudges(name) == get_nudges(name), name
+
+        start = time.perf_counter()
+        for name in sample:
+            get_nudges(name)
+        live_ms = (time.perf_counter() - start) / len(sample) * 1e3
+
+        report(f"nudges for {USERS:,} users ({transactions:,} transactions)", [
+            ("batch precompute", f"{batch_s:.2f} s, {written:,} nudges"),
+            ("live get_nudges, per user", f"{live_ms:.3f} ms"),
+            ("live, extrapolated to all users", f"{live_ms * USERS / 1e3:.2f} s"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
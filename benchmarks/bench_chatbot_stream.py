@@ -0,0 +1,86 @@
+"""
+AI coach latency against a local stub model (no network, no API key needed):
+blocking vs streaming time-to-first-token, and AsyncAdviceClient fan-out with
+retries and a concurrency cap.
+"""
+
+import asyncio
+import time
+
+from ai.chatbot import AsyncAdviceClient, get_financial_advice, get_latency_stats, stream_financial_advice
+from benchmarks._common import report
+
+FIRST_TOKEN_DELAY = 0.4
+CHUNK_DELAY = 0.05
+CHUNKS = 30
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Mimics GenerativeModel.generate_content(_async) with fixed per-chunk delays."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+
+    def _fail_if_flaky(self):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("stub upstream unavailable")
+
+    def _pieces(self, prompt):
+        return [f"piece {i} " for i in range(CHUNKS)]
+
+    def generate_content(self, prompt, stream=False):
+        self._fail_if_flaky()
+        if not stream:
+            time.sleep(FIRST_TOKEN_DELAY + CHUNK_DELAY * CHUNKS)
+            return _Chunk("".join(self._pieces(prompt)))
+        return self._sync_stream(prompt)
+
+    def _sync_stream(self, prompt):
+        time.sleep(FIRST_TOKEN_DELAY)
+        for piece in self._pieces(prompt):
+            yield _Chunk(piece)
+            time.sleep(CHUNK_DELAY)
+
+    async def generate_content_async(self, prompt, stream=False):
+        self._fail_if_flaky()
+        return self._async_stream(prompt)
+
+    async def _async_stream(self, prompt):
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        for piece in self._pieces(prompt):
+            yield _Chunk(piece)
+            await asyncio.sleep(CHUNK_DELAY)
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1e3:.0f} ms"
+
+
+def main():
+    stub = StubModel()
+    blocking = get_financial_advice("How do I start a SIP?", client=stub)
+    streamed = "".join(stream_financial_advice("How do I start a SIP?", client=stub))
+    assert blocking == streamed
+
+    client = AsyncAdviceClient(client=StubModel(failures=2), timeout=2.0, backoff=0.05, max_concurrency=8)
+    start = time.perf_counter()
+    answers = asyncio.run(client.advise_many([f"question {i}" for i in range(32)]))
+    fan_out_s = time.perf_counter() - start
+    assert all(answer == blocking for answer in answers)
+
+    rows = []
+    for path in ("blocking", "stream", "async"):
+        stats = get_latency_stats(path)
+        rows.append((f"{path}: first text / total (p50)", f"{_ms(stats['ttft_p50'])} / {_ms(stats['total_p50'])}"))
+    rows.append(("32 async answers, 8 at a time, 2 retried", f"{fan_out_s:.2f} s"))
+    report("AI coach latency (stub model)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cumulative savings trend at 100k transactions: loading the ledger and a
+row-wise DataFrame.apply or a vectorized np.where, versus daily_savings_trend()
+reading the daily rollups.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from backend import database
+from backend.analytics import daily_savings_trend
+from benchmarks._common import temp_database, best_of, report
+
+USERNAME = "bench_user"
+ROWS = 100_000
+
+
+def seed(username, rows):
+    rng = random.Random(3)
+    start = datetime(2015, 1, 1)
+    data = [
+        (
+            username,
+            round(rng.uniform(10, 2000), 2),
+            "Income" if rng.random() < 0.3 else "Expense",
+            rng.choice(["Food", "Travel", "Salary", "Bills"]),
+            (start + timedelta(minutes=37 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        for i in range(rows)
+    ]
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (username, amount, type, category, date) VALUES (?, ?, ?, ?, ?)",
+            data,
+        )
+        conn.commit()
+    database.rebuild_user_aggregates(username)
+    database.rebuild_rollups(username)
+
+
+def ledger_frame(username):
+    df = pd.DataFrame(database.get_transactions(username), columns=["Amount", "Type", "Category", "Date"])
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.sort_values("Date", kind="stable")
+
+
+def with_apply(df):
+    out = df.copy()
+    out["NetAmount"] = out.apply(lambda r: r["Amount"] if r["Type"] == "Income" else -r["Amount"], axis=1)
+    out["CumulativeSavings"] = out["NetAmount"].cumsum()
+    return out
+
+
+def with_numpy(df):
+    out = df.copy()
+    out["NetAmount"] = np.where(out["Type"] == "Income", out["Amount"], -out["Amount"])
+    out["CumulativeSavings"] = out["NetAmount"].cumsum()
+    return out
+
+
+def main():
+    with temp_database():
+        seed(USERNAME, ROWS)
+        df = ledger_frame(USERNAME)
+
+        per_row = with_apply(df)
+        assert np.allclose(with_numpy(df)["CumulativeSavings"].to_numpy(), per_row["CumulativeSavings"].to_numpy())
+        # The rollup trend has one point per day: the balance after that day's last entry
+        end_of_day = per_row.groupby(per_row["Date"].dt.normalize())["CumulativeSavings"].last()
+        assert np.allclose(daily_savings_trend(USERNAME)["CumulativeSavings"].to_numpy(), end_of_day.to_numpy())
+
+        report(f"cumulative savings over {ROWS:,} transactions", [
+            ("DataFrame.apply (on loaded frame)", f"{best_of(lambda: with_apply(df), repeat=2):.3f} s"),
+            ("np.where (on loaded frame)", f"{best_of(lambda: with_numpy(df)):.3f} s"),
+            ("load + DataFrame.apply", f"{best_of(lambda: with_apply(ledger_frame(USERNAME)), repeat=2):.3f} s"),
+            ("daily_savings_trend (rollups)", f"{best_of(lambda: daily_savings_trend(USERNAME)):.3f} s"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+A classroom burst against a local stub model: every student calling the model
+directly versus going through AdviceDispatcher (pool + token bucket +
+coalescing of identical prompts).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.chatbot import stream_financial_advice
+from ai.dispatcher import AdviceDispatcher
+from benchmarks._common import report
+
+STUDENTS = 300
+DISTINCT_PROMPTS = 12
+CALL_SECONDS = 0.3
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class CountingStub:
+    """Stub model that sleeps like an upstream call and records when each call started."""
+
+    def __init__(self):
+        self.started = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.started.append(time.monotonic())
+        return self._stream(prompt)
+
+    def _stream(self, prompt):
+        for i in range(3):
+            time.sleep(CALL_SECONDS / 3)
+            yield _Chunk(f"{prompt} part {i}. ")
+
+
+def peak_per_second(starts):
+    starts = sorted(starts)
+    return max(sum(1 for t in starts if s <= t < s + 1) for s in starts)
+
+
+def prompts(seed=0):
+    rng = random.Random(seed)
+    return [f"prompt {rng.randrange(DISTINCT_PROMPTS)}" for _ in range(STUDENTS)]
+
+
+def main():
+    direct = CountingStub()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STUDENTS) as pool:
+        list(pool.map(lambda p: "".join(stream_financial_advice(p, client=direct)), prompts()))
+    direct_s = time.perf_counter() - start
+
+    stub = CountingStub()
+    dispatcher = AdviceDispatcher(client=stub, max_workers=4, requests_per_minute=300, burst=5)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STUDENTS) as pool:
+        tickets = list(pool.map(dispatcher.submit, prompts()))
+        answers = list(pool.map(lambda ticket: ticket.result(timeout=30), tickets))
+    dispatched_s = time.perf_counter() - start
+    assert all(answer.startswith(prompt) for answer, prompt in zip(answers, prompts()))
+    status = dispatcher.status()
+    dispatcher.shutdown()
+
+    report(f"{STUDENTS} students, {DISTINCT_PROMPTS} distinct prompts, {CALL_SECONDS}s per call", [
+        ("direct: upstream calls", f"{len(direct.started)}"),
+        ("direct: peak calls per second", f"{peak_per_second(direct.started)}"),
+        ("direct: wall time", f"{direct_s:.2f} s"),
+        ("dispatcher: upstream calls", f"{status['upstream_calls']} ({status['coalesce_rate']:.0%} coalesced)"),
+        ("dispatcher: peak calls per second", f"{peak_per_second(stub.started)} (bucket: burst 5, then 5/s)"),
+        ("dispatcher: wall time", f"{dispatched_s:.2f} s"),
+        ("worst quoted queue position / wait", f"{max(t.position for t in tickets)} / "
+                                               f"{max(t.estimated_wait for t in tickets):.1f} s"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
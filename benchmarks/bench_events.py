@@ -0,0 +1,73 @@
+"""
+Write-behind side effects: what a student waits for when logging a saving
+(insert, then streak, XP and badges inline, as before, versus the insert and
+an outbox row), and how fast the worker catches up applying events in batches
+versus one at a time.
+"""
+
+import time
+
+from backend import database, events
+from backend.database import add_transaction, trace_statements
+from benchmarks._common import best_of, report, temp_database
+
+CLICKS = 300
+USERS = 200
+EVENTS_PER_USER = 25
+
+
+def commits(statements):
+    return sum(1 for sql in statements if sql.lstrip().upper().startswith("COMMIT"))
+
+
+def click_inline(username):
+    # The old request path: every side effect applied before the page reruns
+    add_transaction(username, 500, "Income", "Salary")
+    events.process_pending()
+
+
+def click_deferred(username):
+    add_transaction(username, 500, "Income", "Salary")
+
+
+def catch_up(batch_size):
+    for i in range(USERS * EVENTS_PER_USER):
+        add_transaction(f"user{i % USERS}", 100, "Income", "Salary")
+    started = time.perf_counter()
+    while events.process_pending(batch_size):
+        pass
+    return time.perf_counter() - started
+
+
+def main():
+    with temp_database():
+        database.register_user("inline", "bench")
+        database.register_user("deferred", "bench")
+
+        with trace_statements() as inline_sql:
+            click_inline("inline")
+        with trace_statements() as deferred_sql:
+            click_deferred("deferred")
+        events.drain()
+
+        inline = best_of(lambda: click_inline("inline"), number=CLICKS // 3, repeat=3)
+        deferred = best_of(lambda: click_deferred("deferred"), number=CLICKS // 3, repeat=3)
+        events.drain()
+        assert database.get_streak("inline") == database.get_streak("deferred")
+
+    with temp_database():
+        one_at_a_time = catch_up(batch_size=1)
+    with temp_database():
+        batched = catch_up(batch_size=events.EVENT_BATCH_SIZE)
+
+    n = USERS * EVENTS_PER_USER
+    report("Logging a saving", [
+        ("inline side effects, per click", f"{inline * 1e3:.2f} ms, {commits(inline_sql)} commits"),
+        ("write-behind, per click", f"{deferred * 1e3:.2f} ms, {commits(deferred_sql)} commit"),
+        (f"worker, {n:,} events one at a time", f"{one_at_a_time * 1e3:.0f} ms"),
+        (f"worker, {n:,} events in batches of {events.EVENT_BATCH_SIZE}", f"{batched * 1e3:.0f} ms"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Projection curves over 600-month horizons for dozens of rate scenarios:
+one compound_growth() call per month per rate versus a single growth_curve().
+"""
+
+import numpy as np
+
+from backend.finance import clear_projection_cache, compound_growth, growth_curve
+from benchmarks._common import best_of, report
+
+MONTHLY = 2000.0
+MONTHS = 600
+RATES = np.linspace(0.0, 0.24, 48)
+
+
+def per_month_calls():
+    return [[compound_growth(MONTHLY, rate, m) for m in range(1, MONTHS + 1)] for rate in RATES]
+
+
+def cold_curve(**kwargs):
+    clear_projection_cache()
+    return growth_curve(MONTHLY, RATES, MONTHS, **kwargs)
+
+
+def main():
+    assert np.allclose(np.array(per_month_calls()), growth_curve(MONTHLY, RATES, MONTHS), rtol=1e-10)
+
+    loop_s = best_of(per_month_calls)
+    vector_s = best_of(cold_curve, number=20)
+    step_up_s = best_of(lambda: cold_curve(step_up=0.1), number=20)
+
+    report(f"{len(RATES)} rates x {MONTHS} months", [
+        ("compound_growth per month", f"{loop_s * 1e3:.2f} ms"),
+        ("growth_curve (closed form)", f"{vector_s * 1e3:.2f} ms"),
+        ("growth_curve (10% step-up)", f"{step_up_s * 1e3:.2f} ms"),
+        ("speed-up", f"{loop_s / vector_s:.0f}x"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Bulk statement import: add_transaction() per row versus the streaming
+importer on a generated 1,000,000-row CSV, plus a full re-import (all
+duplicates). Memory: the Python heap peak (tracemalloc) of 50k- and
+200k-row imports should match, since rows are only held one batch at a time;
+process RSS additionally holds SQLite's page cache, capped by
+importer.IMPORT_CACHE_KIB plus the mmap window.
+"""
+
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from backend import database
+from backend.importer import import_file
+from benchmarks._common import report, temp_database
+
+ROWS = 1_000_000
+HEAP_SAMPLE_ROWS = (50_000, 200_000)
+PER_ROW_SAMPLE = 2_000
+CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Investment", "Other"]
+
+
+def write_statement(path, rows, seed=0):
+    """Date-ordered bank CSV, written a line at a time."""
+    rng = random.Random(seed)
+    day = date(2015, 1, 1)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Description", "Category", "Amount"])
+        for i in range(rows):
+            if rng.random() < 0.35:
+                day += timedelta(days=1)
+            if rng.random() < 0.1:
+                writer.writerow([day.isoformat(), "Salary", "Salary", f"{rng.randint(5, 60) * 1000}"])
+            else:
+                writer.writerow([day.isoformat(), f"UPI {rng.randrange(500)}", rng.choice(CATEGORIES),
+                                 f"-{rng.randint(20, 5000)}"])
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def heap_peak_mib(path, username):
+    tracemalloc.start()
+    import_file(username, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    with temp_database(), tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i in range(PER_ROW_SAMPLE):
+            database.add_transaction("per_row", 100.0, "Expense", CATEGORIES[i % len(CATEGORIES)])
+        per_row_s = (time.perf_counter() - start) / PER_ROW_SAMPLE
+
+        heap_peaks = []
+        for rows in HEAP_SAMPLE_ROWS:
+            sample = os.path.join(tmp, f"sample_{rows}.csv")
+            write_statement(sample, rows, seed=rows)
+            heap_peaks.append(heap_peak_mib(sample, f"sample_{rows}"))
+
+        path = os.path.join(tmp, "statement.csv")
+        write_statement(path, ROWS)
+        first = import_file("bulk", path)
+        rss = peak_rss_mib()
+        again = import_file("bulk", path)
+        assert first["inserted"] + first["duplicates"] == ROWS and again["inserted"] == 0
+        assert not database.verify_user_aggregates()
+        assert not database.verify_rollups()
+
+    report(f"Importing {ROWS:,} rows", [
+        ("add_transaction, per row", f"{per_row_s * 1e3:.2f} ms  (~{per_row_s * ROWS / 60:.0f} min for all)"),
+        ("streaming import", f"{first['seconds']:.1f} s  ({ROWS / first['seconds']:,.0f} rows/s, "
+                             f"{first['batches']} batches)"),
+        ("rows inserted / deduped", f"{first['inserted']:,} / {first['duplicates']:,}"),
+        ("re-import, all duplicates", f"{again['seconds']:.1f} s  ({again['duplicates']:,} skipped)"),
+        (f"Python heap peak, {HEAP_SAMPLE_ROWS[0]:,} / {HEAP_SAMPLE_ROWS[1]:,} rows",
+         " / ".join(f"{peak:.1f}" for peak in heap_peaks) + " MiB"),
+        ("process peak RSS (incl. SQLite cache)", f"{rss:.0f} MiB"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cold import cost of the modules every page loads, measured with
+``python -X importtime`` in a fresh interpreter per module.
+
+Also a regression check: modules on the startup path must not pull in the
+heavy libraries they only need on demand. Exits non-zero if one does.
+"""
+
+import subprocess
+import sys
+
+from benchmarks._common import report
+
+# module -> heavy packages it must not import eagerly
+STARTUP_MODULES = {
+    "backend.database": ("numpy", "pandas"),
+    "backend.gamification": ("numpy", "pandas"),
+    "backend.analytics": ("numpy", "pandas"),
+    "backend.nudges": ("numpy", "pandas"),
+    "ai.prompt_builder": ("numpy", "pandas"),
+    "ai.chatbot": ("numpy", "pandas", "google.generativeai", "dotenv"),
+    "ai.dispatcher": ("numpy", "pandas", "google.generativeai"),
+    "backend.finance": ("pandas",),
+}
+HEAVY = ("numpy", "pandas", "plotly", "google.generativeai")
+
+
+def import_profile(module):
+    """(total_us, {direct dependency: cumulative_us}, loaded heavy packages) for a cold import."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    total_us, dependencies = 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        # -X importtime indents each nested import by two more spaces
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth == 0:
+            total_us += int(cumulative_us)
+        elif depth == 1:
+            dependencies[raw_name.strip()] = int(cumulative_us)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total_us, dependencies, loaded
+
+
+def main():
+    rows, failures = [], []
+    for module, forbidden in STARTUP_MODULES.items():
+        total_us, dependencies, loaded = min((import_profile(module) for _ in range(3)), key=lambda p: p[0])
+        heaviest = sorted(dependencies.items(), key=lambda item: -item[1])[:2]
+        detail = ", ".join(f"{name} {us / 1e3:.0f}" for name, us in heaviest)
+        rows.append((module, f"{total_us / 1e3:7.1f} ms  ({detail})"))
+        failures += [f"{module} imports {name} eagerly" for name in forbidden if name in loaded]
+
+    report("Cold import time (best of 3; heaviest direct imports in ms)", rows)
+    for failure in failures:
+        print(f"REGRESSION  {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
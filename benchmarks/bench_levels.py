@@ -0,0 +1,63 @@
+"""
+Level lookup for 1M users: the old linear walk, the bisect lookup called per
+user, and the vectorized get_levels() over the whole XP column.
+"""
+
+import numpy as np
+
+from backend.gamification import LEVEL_THRESHOLDS, get_level, get_levels
+from benchmarks._common import best_of, report
+
+USERS = 1_000_000
+
+
+def linear_level(total_xp):
+    """get_level as it was: a linear walk over LEVEL_THRESHOLDS."""
+    current_level = LEVEL_THRESHOLDS[0]
+    next_threshold = None
+    for i, (threshold, name, level_num) in enumerate(LEVEL_THRESHOLDS):
+        if total_xp >= threshold:
+            current_level = (threshold, name, level_num)
+            next_threshold = LEVEL_THRESHOLDS[i + 1][0] if i + 1 < len(LEVEL_THRESHOLDS) else None
+        else:
+            break
+    current_threshold = current_level[0]
+    xp_in_level = total_xp - current_threshold
+    if next_threshold:
+        xp_needed = next_threshold - current_threshold
+        progress = xp_in_level / xp_needed
+    else:
+        xp_needed = 0
+        progress = 1.0
+    return {
+        "level": current_level[2],
+        "name": current_level[1],
+        "xp_in_level": xp_in_level,
+        "xp_needed": xp_needed,
+        "progress": min(progress, 1.0),
+        "total_xp": total_xp,
+    }
+
+
+def main():
+    rng = np.random.default_rng(11)
+    xp = rng.integers(0, 5000, size=USERS)
+    xp_list = xp.tolist()
+
+    batch = get_levels(xp)
+    sample = rng.choice(USERS, size=2000, replace=False)
+    assert all(batch["level"][i] == get_level(xp_list[i])["level"] == linear_level(xp_list[i])["level"] for i in sample)
+
+    linear_s = best_of(lambda: [linear_level(x) for x in xp_list], repeat=1)
+    bisect_s = best_of(lambda: [get_level(x) for x in xp_list], repeat=1)
+    vector_s = best_of(lambda: get_levels(xp), repeat=3)
+
+    report(f"levelling {USERS:,} users", [
+        ("linear walk, per user", f"{linear_s:.3f} s"),
+        ("get_level (bisect), per user", f"{bisect_s:.3f} s"),
+        ("get_levels, one call", f"{vector_s:.3f} s"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Monte Carlo paths: a Python loop per path versus simulate_paths(), plus peak
+block size for large path counts.
+"""
+
+import math
+
+import numpy as np
+
+from backend.finance import clear_projection_cache, simulate_paths
+from benchmarks._common import best_of, report
+
+MONTHLY = 2000.0
+MEAN, VOLATILITY = 0.10, 0.15
+MONTHS = 120
+
+
+def per_path_loop(n_paths, seed=0):
+    rng = np.random.default_rng(seed)
+    finals = []
+    for _ in range(n_paths):
+        value = 0.0
+        for r in rng.normal(MEAN / 12, VOLATILITY / math.sqrt(12), size=MONTHS):
+            value = value * (1 + max(r, -0.95)) + MONTHLY
+        finals.append(value)
+    return np.percentile(finals, [5, 50, 95])
+
+
+def cold_simulation(n_paths):
+    clear_projection_cache()
+    return simulate_paths(MONTHLY, MEAN, VOLATILITY, MONTHS, n_paths=n_paths, seed=1)
+
+
+def main():
+    loop_1k = best_of(lambda: per_path_loop(1_000), repeat=2)
+    rows = [("per-path loop, 1k paths", f"{loop_1k * 1e3:.1f} ms")]
+    for n_paths in (1_000, 10_000, 100_000):
+        seconds = best_of(lambda: cold_simulation(n_paths), repeat=3)
+        rows.append((f"simulate_paths, {n_paths:,} paths", f"{seconds * 1e3:.1f} ms"))
+
+    big = simulate_paths(MONTHLY, MEAN, VOLATILITY, 600, n_paths=100_000, goal=5_000_000, seed=1)
+    block_months = max(1, 4_000_000 // 100_000)
+    rows.append(("600 months x 100k paths, P(goal 50L)", f"{big['probability']:.3f}"))
+    rows.append(("largest block held in memory", f"{100_000 * block_months * 8 / 2**20:.0f} MiB per array"))
+    report(f"Monte Carlo, {MONTHS} months", rows)
+
+
+if __name__ == "__main__":
+    main()
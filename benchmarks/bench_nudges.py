@@ -0,0 +1,74 @@
+"""
+Nudge generation for a brand-new user versus one with five years of history:
+the old full-ledger pandas filter against the bounded queries get_nudges uses now.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from backend import database
+from backend.nudges import get_nudges
+from benchmarks._common import temp_database, best_of, report
+
+YEARS = 5
+ENTRIES_PER_DAY = 25
+
+
+def seed_history(username, days, per_day):
+    rng = random.Random(5)
+    now = datetime.now()
+    rows = [
+        (
+            username,
+            round(rng.uniform(20, 900), 2),
+            "Income" if rng.random() < 0.25 else "Expense",
+            "Food",
+            (now - timedelta(days=day, minutes=rng.randint(0, 1439))).strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        for day in range(days)
+        for _ in range(per_day)
+    ]
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (username, amount, type, category, date) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    database.rebuild_user_aggregates(username)
+    return len(rows)
+
+
+def full_history_spending(username):
+    """What get_nudges used to do: load the whole ledger and filter in pandas."""
+    data = database.get_transactions(username)
+    if not data:
+        return 0, 0, 0, 0
+    df = pd.DataFrame(data, columns=["Amount", "Type", "Category", "Date"])
+    df["Date"] = pd.to_datetime(df["Date"])
+    week_ago = datetime.now() - timedelta(days=7)
+    two_weeks_ago = datetime.now() - timedelta(days=14)
+    expenses = df[df["Type"] == "Expense"]
+    recent = expenses[expenses["Date"] >= week_ago]["Amount"].sum()
+    previous = expenses[(expenses["Date"] >= two_weeks_ago) & (expenses["Date"] < week_ago)]["Amount"].sum()
+    income = df[df["Type"] == "Income"]["Amount"].sum()
+    return recent, previous, income, expenses["Amount"].sum()
+
+
+def main():
+    with temp_database():
+        database.register_user("new_user", "bench")
+        database.register_user("veteran", "bench")
+        rows = seed_history("veteran", YEARS * 365, ENTRIES_PER_DAY)
+
+        report(f"get_nudges (veteran has {rows:,} transactions)", [
+            ("full-history filter, new user (ms)", f"{best_of(lambda: full_history_spending('new_user'), number=20) * 1e3:.2f}"),
+            ("full-history filter, veteran (ms)", f"{best_of(lambda: full_history_spending('veteran'), repeat=3) * 1e3:.2f}"),
+            ("get_nudges, new user (ms)", f"{best_of(lambda: get_nudges('new_user'), number=20) * 1e3:.2f}"),
+            ("get_nudges, veteran (ms)", f"{best_of(lambda: get_nudges('veteran'), number=20) * 1e3:.2f}"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Transaction history at 100k rows: the whole ledger per rerun (get_transactions)
+versus one keyset page, first and deep, with and without filters. A page's
+cost and payload should not depend on the history length or the page depth.
+"""
+
+import pickle
+import random
+from datetime import date, datetime, timedelta
+
+from backend import database
+from benchmarks._common import best_of, report, temp_database
+
+ROWS = 100_000
+CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Investment", "Salary", "Freelance", "Other"]
+
+
+def seed(username, rows):
+    rng = random.Random(7)
+    start = datetime(2012, 1, 1)
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (username, amount, type, category, date) VALUES (?, ?, ?, ?, ?)",
+            [
+                (username, round(rng.uniform(10, 3000), 2), "Income" if rng.random() < 0.2 else "Expense",
+                 rng.choice(CATEGORIES), (start + timedelta(minutes=72 * i)).strftime("%Y-%m-%d %H:%M:%S"))
+                for i in range(rows)
+            ],
+        )
+        conn.commit()
+
+
+def page_at(username, depth, **filters):
+    """Cursor of the page `depth` pages back, walked the way the table does."""
+    cursor = None
+    for _ in range(depth):
+        cursor = database.get_transactions_page(username, before=cursor, **filters)["next"]
+    return cursor
+
+
+def kib(value):
+    return f"{len(pickle.dumps(value)) / 1024:,.0f} KiB"
+
+
+def main():
+    with temp_database():
+        seed("heavy", ROWS)
+        everything = database.get_transactions("heavy")
+        deep = page_at("heavy", 1_000)
+        filters = {"t_type": "Expense", "category": "Food", "start": date(2015, 1, 1), "end": date(2016, 1, 1)}
+        first = database.get_transactions_page("heavy")
+
+        rows = [
+            (f"get_transactions, {ROWS:,} rows", f"{best_of(lambda: database.get_transactions('heavy')) * 1e3:.1f} ms, "
+                                               f"{kib(everything)}"),
+            ("first page", f"{best_of(lambda: database.get_transactions_page('heavy'), number=100) * 1e3:.3f} ms, "
+                           f"{kib(first['rows'])}"),
+            ("page 1,001", f"{best_of(lambda: database.get_transactions_page('heavy', before=deep), number=100) * 1e3:.3f} ms"),
+            ("filtered: Food expenses in 2015",
+             f"{best_of(lambda: database.get_transactions_page('heavy', **filters), number=100) * 1e3:.3f} ms"),
+        ]
+    report("Transaction history", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Simulator / goal-tracker reruns: many sessions nudging the same few sliders,
+replayed with and without the process-wide projection cache.
+"""
+
+import random
+import time
+
+from backend.finance import clear_projection_cache, get_projection_cache_stats, growth_curve, simulate_paths
+from benchmarks._common import report
+
+RATES = [0.06, 0.10, 0.15]
+VOLATILITY = {0.06: 0.01, 0.10: 0.15, 0.15: 0.22}
+RERUNS = 2_000
+
+
+def rerun_inputs(seed=0):
+    """Slider states in the ranges the pages offer, with the usual defaults most likely."""
+    rng = random.Random(seed)
+    for _ in range(RERUNS):
+        monthly = rng.choice([2000.0] * 6 + [500.0, 1000.0, 2500.0, 5000.0])
+        months = rng.choice([12] * 6 + [6, 24, 36, 60])
+        rate = rng.choice(RATES)
+        yield monthly, months, rate
+
+
+def page_rerun(monthly, months, rate):
+    growth_curve(monthly, RATES, months)
+    simulate_paths(monthly, rate, VOLATILITY[rate], months, n_paths=10_000, goal=50_000, seed=42)
+
+
+def replay(cached):
+    clear_projection_cache()
+    start = time.perf_counter()
+    for inputs in rerun_inputs():
+        if not cached:
+            clear_projection_cache()
+        page_rerun(*inputs)
+    return time.perf_counter() - start
+
+
+def main():
+    uncached_s = replay(cached=False)
+    before = get_projection_cache_stats()
+    cached_s = replay(cached=True)
+    stats = get_projection_cache_stats()
+    hits, misses = stats["hits"] - before["hits"], stats["misses"] - before["misses"]
+    report(f"{RERUNS:,} page reruns", [
+        ("without cache", f"{uncached_s * 1e3 / RERUNS:.2f} ms/rerun"),
+        ("with cache", f"{cached_s * 1e3 / RERUNS:.2f} ms/rerun"),
+        ("hit rate", f"{hits / (hits + misses):.1%}"),
+        ("entries held", f"{stats['size']} / {stats['maxsize']}"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Prompt size over a long coach conversation: the whole history pasted into
+every prompt versus build_prompt() with a ConversationMemory.
+"""
+
+import random
+import time
+
+from ai.prompt_builder import ConversationMemory, build_prompt, estimate_tokens, get_prompt_size_stats
+from benchmarks._common import report
+
+TURNS = 200
+PROFILE = "- Level 3 (Smart Saver 🧠), 210 XP, 4 badges\n- Saving streak: 6 days\n- Income ₹12,000, expenses ₹9,500"
+
+
+def conversation(seed=0):
+    rng = random.Random(seed)
+    for i in range(TURNS):
+        question = f"Follow-up {i}: " + "what about SIPs, index funds and my emergency fund? " * rng.randint(1, 4)
+        answer = "Great question! " + " ".join(
+            f"Point {j}: keep investing small amounts every month and review your goals." for j in range(rng.randint(3, 25))
+        )
+        yield question, answer
+
+
+def main():
+    memory = ConversationMemory()
+    history, naive_tokens, built_tokens, build_s = [], [], [], 0.0
+    for question, answer in conversation():
+        naive = "\n".join(text for _, text in history) + question
+        naive_tokens.append(estimate_tokens(naive) + estimate_tokens(PROFILE))
+        start = time.perf_counter()
+        _prompt, metrics = build_prompt(question, PROFILE, history, memory=memory)
+        build_s += time.perf_counter() - start
+        built_tokens.append(metrics["total_tokens"])
+        history += [("user", question), ("assistant", answer)]
+
+    stats = get_prompt_size_stats()
+    report(f"{TURNS}-turn conversation", [
+        ("full history, turn 10 / 50 / 200",
+         f"{naive_tokens[9]:,} / {naive_tokens[49]:,} / {naive_tokens[-1]:,} tokens"),
+        ("budgeted, turn 10 / 50 / 200",
+         f"{built_tokens[9]:,} / {built_tokens[49]:,} / {built_tokens[-1]:,} tokens"),
+        ("budgeted p95 / max", f"{stats['p95_tokens']:,} / {stats['max_tokens']:,} tokens"),
+        ("build_prompt per turn", f"{build_s / TURNS * 1e6:.0f} us"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
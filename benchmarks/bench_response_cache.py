@@ -0,0 +1,79 @@
+"""
+AI coach response cache: lookup latency for in-memory, SQLite and paraphrase
+hits, and the hit rate over a classroom-style stream of repeated questions.
+"""
+
+import random
+import zlib
+
+import numpy as np
+
+from ai import chatbot
+from benchmarks._common import best_of, report, temp_database
+
+QUESTIONS = [
+    "How do I start a SIP?",
+    "What is an emergency fund?",
+    "Should I invest in index funds or FDs?",
+    "How much should a student save every month?",
+    "What is the 50-30-20 rule?",
+    "How does compound interest work?",
+]
+BUCKETS = [chatbot.profile_bucket(level, 1000, expense) for level in (1, 2, 3) for expense in (950, 800, 500)]
+ASKS = 5_000
+
+
+def bag_of_words(text, dims=256):
+    """Tiny local embedding: hashed word counts. Good enough to catch reworded repeats."""
+    vector = np.zeros(dims, dtype=np.float32)
+    for word in text.split():
+        vector[zlib.crc32(word.encode()) % dims] += 1
+    return vector
+
+
+def asks(seed=0):
+    rng = random.Random(seed)
+    for _ in range(ASKS):
+        question = rng.choice(QUESTIONS)
+        if rng.random() < 0.3:
+            question = "Hey, " + question.lower().rstrip("?") + " please?"
+        yield question, rng.choice(BUCKETS)
+
+
+def replay():
+    answered = 0
+    for question, bucket in asks():
+        if chatbot.get_cached_advice(question, bucket) is None:
+            chatbot.cache_advice(question, bucket, f"answer to {question}")
+            answered += 1
+    return answered
+
+
+def main():
+    with temp_database():
+        chatbot.clear_response_cache()
+        upstream_calls = replay()
+
+        chatbot.clear_response_cache()
+        chatbot.set_embedding_function(bag_of_words, threshold=0.8)
+        similar_calls = replay()
+        stats = chatbot.get_response_cache_stats()
+
+        question, bucket = QUESTIONS[0], BUCKETS[0]
+        memory_s = best_of(lambda: chatbot.get_cached_advice(question, bucket), number=1000)
+        chatbot._response_memory.clear()
+        sqlite_s = best_of(lambda: (chatbot._response_memory.clear(), chatbot.get_cached_advice(question, bucket)),
+                           number=200)
+        chatbot.set_embedding_function(None)
+
+    report(f"{ASKS:,} questions, {len(BUCKETS)} profile buckets", [
+        ("upstream calls, exact keys only", f"{upstream_calls} ({1 - upstream_calls / ASKS:.1%} hits)"),
+        ("upstream calls, with paraphrase lookup", f"{similar_calls} ({1 - similar_calls / ASKS:.1%} hits)"),
+        ("paraphrase hits", f"{stats['similar_hits']}"),
+        ("in-memory hit", f"{memory_s * 1e6:.1f} us"),
+        ("SQLite hit", f"{sqlite_s * 1e3:.3f} ms"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
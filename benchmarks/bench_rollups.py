@@ -0,0 +1,83 @@
+"""
+Chart data at 10k and 100k transactions: grouping the ledger on every rerun
+versus reading the daily/monthly rollups, plus what maintaining the rollups
+adds to add_transaction().
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from backend import database
+from backend.analytics import daily_savings_trend, monthly_totals, totals_by_category
+from benchmarks._common import best_of, report, temp_database
+
+CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Investment", "Salary", "Freelance", "Other"]
+
+LEDGER_PIE_SQL = """
+    SELECT type, category, SUM(amount) FROM transactions WHERE username=? AND type=? GROUP BY category
+"""
+LEDGER_TREND_SQL = """
+    SELECT date, SUM(CASE WHEN type='Income' THEN amount ELSE -amount END)
+               OVER (ORDER BY date ROWS UNBOUNDED PRECEDING)
+    FROM transactions WHERE username=? ORDER BY date
+"""
+LEDGER_MONTHS_SQL = """
+    SELECT substr(date, 1, 7) AS month,
+           SUM(CASE WHEN type='Income' THEN amount ELSE 0 END),
+           SUM(CASE WHEN type='Expense' THEN amount ELSE 0 END)
+    FROM transactions WHERE username=? GROUP BY month ORDER BY month DESC LIMIT 12
+"""
+
+
+def seed(username, rows):
+    # About 20 entries a day, so 100k rows span some 14 years
+    rng = random.Random(5)
+    start = datetime(2012, 1, 1)
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (username, amount, type, category, date) VALUES (?, ?, ?, ?, ?)",
+            [
+                (username, round(rng.uniform(10, 3000), 2), "Income" if rng.random() < 0.2 else "Expense",
+                 rng.choice(CATEGORIES), (start + timedelta(minutes=72 * i)).strftime("%Y-%m-%d %H:%M:%S"))
+                for i in range(rows)
+            ],
+        )
+        conn.commit()
+    database.rebuild_rollups(username)
+
+
+def ledger_charts(username):
+    with database.get_connection() as conn:
+        for t_type in ("Expense", "Income"):
+            conn.execute(LEDGER_PIE_SQL, (username, t_type)).fetchall()
+        conn.execute(LEDGER_TREND_SQL, (username,)).fetchall()
+        conn.execute(LEDGER_MONTHS_SQL, (username,)).fetchall()
+
+
+def rollup_charts(username):
+    totals_by_category(username, "Expense")
+    totals_by_category(username, "Income")
+    daily_savings_trend(username)
+    monthly_totals(username)
+
+
+def main():
+    rows = []
+    with temp_database():
+        for n in (10_000, 100_000):
+            username = f"user{n}"
+            seed(username, n)
+            assert not database.verify_rollups()
+            rows.append((f"{n:,} txns, charts from the ledger", f"{best_of(lambda: ledger_charts(username)) * 1e3:.1f} ms"))
+            rows.append((f"{n:,} txns, charts from rollups", f"{best_of(lambda: rollup_charts(username)) * 1e3:.1f} ms"))
+            rows.append((f"{n:,} txns, trend points ledger / rollups",
+                         f"{n:,} / {len(daily_savings_trend(username)):,}"))
+
+        database.register_user("writer", "bench")
+        per_row = best_of(lambda: database.add_transaction("writer", 100.0, "Expense", "Food"), number=200, repeat=3)
+        rows.append(("add_transaction incl. rollups", f"{per_row * 1e3:.3f} ms"))
+    report("Chart data: ledger versus rollups", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Streak engine: replaying saving days one update_streak() at a time versus
+rebuilding from the ledger in one pass, per-user versus vectorized streaks for
+every user, and a back-dated insert versus a full rescan of that user.
+"""
+
+import random
+from datetime import date, timedelta
+
+from backend import database
+from backend.streaks import all_user_streaks, compute_streak
+from benchmarks._common import best_of, report, temp_database
+
+USERS = 2_000
+DAYS = 365
+START = date(2024, 1, 1)
+
+
+def saving_days(rng):
+    # Most days saved, with occasional gaps that break the streak
+    return [(START + timedelta(days=d)).isoformat() for d in range(DAYS) if rng.random() < 0.85]
+
+
+def main():
+    rng = random.Random(7)
+    history = {f"user{i}": saving_days(rng) for i in range(USERS)}
+    rows = [(user, day) for user in sorted(history) for day in history[user]]
+
+    per_user = best_of(lambda: [compute_streak(days) for days in history.values()], repeat=3)
+    vectorized = best_of(lambda: all_user_streaks(rows), repeat=3)
+    _, states = all_user_streaks(rows)
+    assert all(tuple(compute_streak(history[user])) == tuple(state) for user, *state in states)
+
+    with temp_database():
+        days = history["user0"]
+        with database.get_connection() as conn:
+            conn.executemany(
+                "INSERT INTO transactions (username, amount, type, category, date) VALUES (?, 100, 'Income', 'Salary', ?)",
+                [(user, f"{day} 09:00:00") for user, day in rows],
+            )
+            conn.commit()
+
+        def replay():
+            # What fixing one user used to take: one streak update per saving day
+            for day in days:
+                database.update_streak("replay", day)
+
+        replay_s = best_of(replay, repeat=1)
+        rebuild_one = best_of(lambda: database.rebuild_streaks("user0"), repeat=3)
+        assert database.get_streak("replay")["total_xp"] == database.get_streak("user0")["total_xp"]
+        rebuild_all = best_of(lambda: database.rebuild_streaks(), repeat=1)
+
+        # Back-date into a gap of user1's history: merges two runs via the stored runs
+        present = set(history["user1"])
+        gaps = [d for d in range(1, DAYS - 1) if (START + timedelta(days=d)).isoformat() not in present]
+        gap_days = iter(START + timedelta(days=d) for d in gaps)
+        backdated = best_of(lambda: database.update_streak("user1", next(gap_days)), repeat=min(len(gaps), 20))
+        rescan = best_of(lambda: database.rebuild_streaks("user1"), repeat=3)
+
+    report(f"Saving streaks, {USERS:,} users x {DAYS} days", [
+        ("one pass per user (all users)", f"{per_user * 1e3:.1f} ms"),
+        ("vectorized run-length (all users)", f"{vectorized * 1e3:.1f} ms"),
+        (f"replay {len(days)} days via update_streak", f"{replay_s * 1e3:.1f} ms"),
+        ("rebuild one user from the ledger", f"{rebuild_one * 1e3:.2f} ms"),
+        ("rebuild every user from the ledger", f"{rebuild_all * 1e3:.0f} ms"),
+        ("back-dated saving day (incremental)", f"{backdated * 1e3:.2f} ms"),
+        ("same, by rescanning the user", f"{rescan * 1e3:.2f} ms"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
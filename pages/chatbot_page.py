@@ -1,32 +1,29 @@
 import streamlit as st
-import pandas as pd
-from backend.database import get_transactions, get_streak
 from backend.gamification import get_gamification_summary
-from ai.chatbot import get_financial_advice
+from backend.analytics import totals_by_type
+from ai.chatbot import (
+    get_cached_advice, cache_advice,
+    is_cacheable_question, profile_bucket, saving_rate_band,
+)
+from ai.prompt_builder import ConversationMemory, build_prompt, profile_summary, bucket_profile_summary
+from ai.dispatcher import get_dispatcher, DispatcherBusy
 
 st.title("🤖 AI Financial Coach")
 
 username = st.session_state.username
 
 # Load financial data
-data = get_transactions(username)
 gamification = get_gamification_summary(username)
-
-income = 0
-expense = 0
-
-if data:
-    df = pd.DataFrame(data, columns=["Amount", "Type", "Category", "Date"])
-    income = df[df["Type"] == "Income"]["Amount"].sum()
-    expense = df[df["Type"] == "Expense"]["Amount"].sum()
-
-savings = income - expense
-streak = gamification["streak"]
+totals = totals_by_type(username)
+income = totals["Income"]
+expense = totals["Expense"]
 level = gamification["level"]
 
 # Chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ConversationMemory()
 
 # Display chat history
 for role, msg in st.session_state.messages:
@@ -37,36 +34,36 @@ user_query = st.chat_input("Ask anything about your finances...")
 if user_query:
     st.chat_message("user").write(user_query)
 
-    # Build smart context prompt with gamification data
-    full_prompt = f"""
-    You are FinMentor, a friendly and motivating financial mentor for students.
-    Communicate in a clear, encouraging, and practical way.
-    Use emojis to keep things engaging. Keep answers concise but helpful.
-
-    User Profile:
-    - Username: {username}
-    - Level: {level['level']} ({level['name']})
-    - Current Saving Streak: {streak['current_streak']} days
-    - Total XP: {level['total_xp']}
-    - Badges Earned: {gamification['badge_count']}
-
-    Financial Summary:
-    - Total Income: ₹{income:,.0f}
-    - Total Expenses: ₹{expense:,.0f}
-    - Net Savings: ₹{savings:,.0f}
-    - Saving Rate: {(savings/income*100):.1f}% {'(Excellent! 🌟)' if income > 0 and savings/income > 0.3 else '(Needs improvement 💪)' if income > 0 else '(No data yet)'}
-
-    User Question:
-    {user_query}
-
-    Provide clear, practical, and motivating advice tailored to a student.
-    If they ask about their data, reference the actual numbers above.
-    Suggest specific actionable steps when possible.
-    """
-
-    response = get_financial_advice(full_prompt)
-
-    st.chat_message("assistant").write(response)
+    history = st.session_state.messages
+    bucket = profile_bucket(level['level'], income, expense)
+    # Shared answers only make sense for an opening question that needs no chat context
+    cacheable = not history and is_cacheable_question(user_query)
+    response = get_cached_advice(user_query, bucket) if cacheable else None
+
+    if response is not None:
+        st.chat_message("assistant").write(response)
+    else:
+        if cacheable:
+            # The prompt carries only the profile bucket, so the answer can be
+            # shared with every student in the same bucket
+            profile = bucket_profile_summary(level['level'], level['name'], saving_rate_band(income, expense))
+        else:
+            profile = profile_summary(username)
+        full_prompt, _metrics = build_prompt(user_query, profile, history, memory=st.session_state.chat_memory)
+
+        # Shared queue: identical in-flight prompts get one upstream call
+        try:
+            ticket = get_dispatcher().submit(full_prompt)
+        except DispatcherBusy as busy:
+            st.warning(f"⏳ {busy}")
+            st.stop()
+        if ticket.position:
+            st.caption(f"⏳ {ticket.position} question(s) ahead of yours — about {ticket.estimated_wait:.0f}s")
+
+        # Render the answer as it streams in instead of waiting for all of it
+        response = st.chat_message("assistant").write_stream(ticket.stream())
+        if cacheable and not ticket.failed:
+            cache_advice(user_query, bucket, response)
 
     st.session_state.messages.append(("user", user_query))
     st.session_state.messages.append(("assistant", response))
@@ -1,48 +1,76 @@
+import io
+from datetime import date, timedelta
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from backend.database import add_transaction, get_transactions
-from backend.gamification import check_and_award_badges
+from backend.database import add_transaction, get_transactions_page, get_user_aggregates
+from backend.importer import import_transactions, read_statement
+from backend.events import start_worker, pop_new_badges
+from backend.analytics import totals_by_type, totals_by_category
+
+CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Investment", "Salary", "Freelance", "Other"]
 
 st.title("📅 Daily Tracker")
 user = st.session_state.username
+start_worker()
+
+# Badges the event worker awarded since the last run
+for badge in pop_new_badges(user):
+    st.toast(f"🎉 Badge Unlocked: {badge}", icon="🏆")
 
 st.markdown("### ➕ Add Transaction")
 
 col1, col2 = st.columns(2)
 with col1:
     amount = st.number_input("Amount (₹)", min_value=0.0, step=100.0)
-    category = st.selectbox("Category", ["Food", "Travel", "Shopping", "Bills", "Investment", "Salary", "Freelance", "Other"])
+    category = st.selectbox("Category", CATEGORIES)
 
 with col2:
     t_type = st.selectbox("Type", ["Income", "Expense"])
-    st.markdown("")  # spacer
-    st.markdown("")  # spacer
+    entry_date = st.date_input("Date", value=date.today(), max_value=date.today())
 
 if st.button("💾 Add Transaction", use_container_width=True):
     if amount > 0:
-        add_transaction(user, amount, t_type, category)
-        # Check for new badges after adding transaction
-        new_badges = check_and_award_badges(user)
+        # Today's entries keep their time of day; earlier ones are back-dated.
+        # Streak, XP and badges follow from the event worker.
+        add_transaction(user, amount, t_type, category,
+                        date=None if entry_date == date.today() else entry_date)
         st.success("✅ Transaction Added!")
-        if new_badges:
-            for badge in new_badges:
-                st.toast(f"🎉 Badge Unlocked: {badge}", icon="🏆")
         st.rerun()
     else:
         st.warning("Please enter a valid amount")
 
+# ── Import Bank Statement ──
+with st.expander("📥 Import bank statement (CSV / OFX)"):
+    st.caption("CSV needs a header row with a date column and an amount (or debit/credit) column. "
+               "Rows already in your history are skipped, so re-uploading is safe.")
+    statement = st.file_uploader("Statement file", type=["csv", "ofx", "qfx"])
+    if statement is not None and st.button("📥 Import", use_container_width=True):
+        fmt = "ofx" if statement.name.lower().endswith((".ofx", ".qfx")) else "csv"
+        # Parsed as a stream, so large statements never sit in memory as text
+        lines = io.TextIOWrapper(statement, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            with st.spinner("Importing..."):
+                result = import_transactions(user, read_statement(lines, fmt))
+        except ValueError as e:
+            st.error(f"❌ Could not read this file: {e}")
+        else:
+            st.success(f"✅ Imported {result['inserted']:,} transactions "
+                       f"({result['duplicates']:,} already in your history, {result['rejected']:,} rows skipped)")
+            for error in result["errors"]:
+                st.caption(f"⚠ {error}")
+            st.caption("🔥 Streaks and badges for the imported savings update in a moment.")
+
 st.divider()
 
 # ── Transaction History ──
-data = get_transactions(user)
+if get_user_aggregates(user)["txn_count"] > 0:
+    # Charting/table libraries are only needed once there is data to show
+    import pandas as pd
+    import plotly.express as px
 
-if data:
-    df = pd.DataFrame(data, columns=["Amount", "Type", "Category", "Date"])
-    
     # ── Summary Metrics ──
-    income = df[df["Type"] == "Income"]["Amount"].sum()
-    expense = df[df["Type"] == "Expense"]["Amount"].sum()
+    totals = totals_by_type(user)
+    income = totals["Income"]
+    expense = totals["Expense"]
     savings = income - expense
 
     st.markdown("### 📋 Summary")
@@ -59,7 +87,7 @@ if data:
     
     with chart_col1:
         st.markdown("### 🍩 Expense by Category")
-        expense_df = df[df["Type"] == "Expense"]
+        expense_df = totals_by_category(user, "Expense")
         if not expense_df.empty:
             fig = px.pie(
                 expense_df, names="Category", values="Amount",
@@ -73,7 +101,7 @@ if data:
     
     with chart_col2:
         st.markdown("### 📊 Income by Category")
-        income_df = df[df["Type"] == "Income"]
+        income_df = totals_by_category(user, "Income")
         if not income_df.empty:
             fig = px.pie(
                 income_df, names="Category", values="Amount",
@@ -89,7 +117,38 @@ if data:
 
     # ── Transaction Table ──
     st.markdown("### 📝 All Transactions")
-    st.dataframe(df, use_container_width=True, hide_index=True)
+    f1, f2, f3 = st.columns(3)
+    type_filter = f1.selectbox("Type", ["All", "Income", "Expense"], key="history_type")
+    category_filter = f2.selectbox("Category", ["All"] + CATEGORIES, key="history_category")
+    date_range = f3.date_input("Dates", value=(), max_value=date.today(), key="history_dates")
+
+    filters = {
+        "t_type": None if type_filter == "All" else type_filter,
+        "category": None if category_filter == "All" else category_filter,
+        "start": date_range[0] if len(date_range) == 2 else None,
+        "end": date_range[1] + timedelta(days=1) if len(date_range) == 2 else None,
+    }
+    # One page per rerun; the cursors of pages already visited make "Newer" work
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    page = get_transactions_page(user, before=cursors[-1], **filters)
+
+    if page["rows"]:
+        df = pd.DataFrame(page["rows"], columns=["Amount", "Type", "Category", "Date"])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.info("No transactions match these filters")
+
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("← Newer", disabled=len(cursors) == 1, use_container_width=True):
+        cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(cursors)}")
+    if next_col.button("Older →", disabled=page["next"] is None, use_container_width=True):
+        cursors.append(page["next"])
+        st.rerun()
 
 else:
     st.info("🚀 No transactions yet. Add your first entry above to start tracking!")
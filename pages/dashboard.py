@@ -1,31 +1,30 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-from backend.database import get_transactions, get_streak, get_badges, get_recent_transactions, get_total_savings
+from backend.database import get_streak, get_badges, get_recent_transactions, get_total_savings, get_user_aggregates
 from backend.gamification import get_gamification_summary, check_and_award_badges, BADGE_DEFINITIONS
+from backend.events import pop_new_badges
 from backend.scoring import health_score
-from backend.nudges import get_nudges
-import pandas as pd
+from backend.nudges import load_nudges
+from backend.analytics import daily_savings_trend, monthly_totals, totals_by_type, totals_by_category
 from datetime import datetime
 
 st.title("📊 Financial Dashboard")
 user = st.session_state.username
 
 # ── Check & award any new badges ──
-new_badges = check_and_award_badges(user)
+new_badges = pop_new_badges(user) + check_and_award_badges(user)
 if new_badges:
     for badge in new_badges:
         st.toast(f"🎉 Badge Unlocked: {badge}", icon="🏆")
 
 # ── Load data ──
-data = get_transactions(user)
+has_transactions = get_user_aggregates(user)["txn_count"] > 0
 gamification = get_gamification_summary(user)
 streak = gamification["streak"]
 level = gamification["level"]
 badges = gamification["badges"]
 
 # ── Behavioral Nudges ──
-nudges = get_nudges(user)
+nudges = load_nudges(user)
 if nudges:
     for nudge in nudges:
         if nudge["type"] == "warning":
@@ -55,11 +54,14 @@ else:
 
 st.divider()
 
-if data:
-    df = pd.DataFrame(data, columns=["Amount", "Type", "Category", "Date"])
+if has_transactions:
+    # Plotly (and the pandas it pulls in) is only needed once there is data to chart
+    import plotly.graph_objects as go
+    import plotly.express as px
 
-    income = df[df["Type"] == "Income"]["Amount"].sum()
-    expense = df[df["Type"] == "Expense"]["Amount"].sum()
+    totals = totals_by_type(user)
+    income = totals["Income"]
+    expense = totals["Expense"]
     rate = (income - expense) / income * 100 if income > 0 else 0
     score = health_score(rate)
 
@@ -92,17 +94,11 @@ if data:
 
     with chart_col2:
         st.markdown("### 📈 Savings Trend")
-        df["Date"] = pd.to_datetime(df["Date"])
-        df_sorted = df.sort_values("Date")
-
-        # Calculate cumulative savings over time
-        df_sorted["NetAmount"] = df_sorted.apply(
-            lambda r: r["Amount"] if r["Type"] == "Income" else -r["Amount"], axis=1
-        )
-        df_sorted["CumulativeSavings"] = df_sorted["NetAmount"].cumsum()
+        # End-of-day running balance from the daily rollups
+        trend_df = daily_savings_trend(user)
 
         fig_trend = px.area(
-            df_sorted, x="Date", y="CumulativeSavings",
+            trend_df, x="Date", y="CumulativeSavings",
             labels={"CumulativeSavings": "Cumulative Savings (₹)", "Date": ""},
             color_discrete_sequence=["#00C6FF"]
         )
@@ -116,7 +112,7 @@ if data:
 
     with pie_col:
         st.markdown("### 🍩 Expense Breakdown")
-        expense_df = df[df["Type"] == "Expense"]
+        expense_df = totals_by_category(user, "Expense")
         if not expense_df.empty:
             fig_pie = px.pie(
                 expense_df, names="Category", values="Amount",
@@ -130,9 +126,10 @@ if data:
 
     with bar_col:
         st.markdown("### 📊 Income vs Expense")
+        months_df = monthly_totals(user, months=12)
         fig_bar = go.Figure(data=[
-            go.Bar(name="Income", x=["Summary"], y=[income], marker_color="#69F0AE"),
-            go.Bar(name="Expense", x=["Summary"], y=[expense], marker_color="#FF5252"),
+            go.Bar(name="Income", x=months_df["Month"], y=months_df["Income"], marker_color="#69F0AE"),
+            go.Bar(name="Expense", x=months_df["Month"], y=months_df["Expense"], marker_color="#FF5252"),
         ])
         fig_bar.update_layout(
             barmode="group", height=300,
@@ -1,6 +1,6 @@
 import streamlit as st
 import plotly.graph_objects as go
-from backend.finance import compound_growth
+from backend.finance import growth_curve, required_monthly, required_months, simulate_paths
 from backend.gamification import check_and_award_badges
 from backend.database import award_badge
 
@@ -23,9 +23,13 @@ with col2:
 
 risk_map = {"🟢 Low Risk (6%)": 0.06, "🟡 Medium Risk (10%)": 0.10, "🔴 High Risk (15%)": 0.15}
 risk_rate = risk_map[risk_option]
+# Typical yearly swings for each risk level, used for the success probability
+risk_volatility = {0.06: 0.01, 0.10: 0.15, 0.15: 0.22}
 
-future_value = compound_growth(monthly_saving, risk_rate, months)
+future_value = growth_curve(monthly_saving, [risk_rate], months)[0, -1]
 total_invested = monthly_saving * months
+goal_odds = simulate_paths(monthly_saving, risk_rate, risk_volatility[risk_rate], months,
+                           n_paths=10_000, goal=goal, seed=42)["probability"]
 
 st.divider()
 
@@ -75,6 +79,7 @@ col1, col2, col3 = st.columns(3)
 col1.metric("💵 Total Invested", f"₹{total_invested:,.0f}")
 col2.metric("📈 Expected Returns", f"₹{future_value - total_invested:,.0f}")
 col3.metric("🎯 Goal Progress", f"{progress*100:.1f}%")
+st.caption(f"🎲 In 10,000 simulated markets, this plan reached your goal **{goal_odds:.0%}** of the time.")
 
 st.progress(progress)
 
@@ -82,9 +87,8 @@ st.divider()
 
 # ── Recommendation ──
 if future_value < goal:
-    needed_monthly = goal  # approximate finding
-    for test_monthly in range(int(monthly_saving), int(goal), 100):
-        if compound_growth(test_monthly, risk_rate, months) >= goal:
-            needed_monthly = test_monthly
-            break
-    st.info(f"💡 **Suggestion**: To reach your goal of ₹{goal:,.0f}, try saving **₹{needed_monthly:,.0f}/month** instead.")
+    # Exact inverses of the projection — no trial-and-error search
+    needed_monthly = required_monthly(goal, risk_rate, months)
+    needed_months = required_months(goal, monthly_saving, risk_rate)
+    st.info(f"💡 **Suggestion**: To reach your goal of ₹{goal:,.0f}, try saving **₹{needed_monthly:,.0f}/month** instead, "
+            f"or keep saving ₹{monthly_saving:,.0f}/month for **{needed_months} months**.")
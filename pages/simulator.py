@@ -1,6 +1,6 @@
 import streamlit as st
 import plotly.graph_objects as go
-from backend.finance import compound_growth
+from backend.finance import growth_curve, contribution_schedule, simulate_paths
 
 st.title("📈 Investment Simulator")
 
@@ -9,23 +9,28 @@ st.markdown("Simulate how your micro-investments can grow over time at different
 col1, col2 = st.columns(2)
 with col1:
     monthly_saving = st.number_input("Monthly Saving Amount (₹)", min_value=100.0, value=2000.0, step=500.0)
+    step_up_pct = st.slider("Yearly Step-up (%)", 0, 25, 0, help="Raise your SIP by this much every 12 months")
 with col2:
     months = st.slider("Investment Duration (Months)", 1, 60, 12)
 
+step_up = step_up_pct / 100
+
 risk_rates = {
     "🟢 Low Risk (6% — FD/RD)": 0.06,
     "🟡 Medium Risk (10% — Index Fund)": 0.10,
     "🔴 High Risk (15% — Equity SIP)": 0.15
 }
 
+# Typical yearly swings used by the Monte Carlo view
+risk_volatility = {0.06: 0.01, 0.10: 0.15, 0.15: 0.22}
+
 fig = go.Figure()
 
+# Every month of every risk profile in one vectorized call
+curves = growth_curve(monthly_saving, list(risk_rates.values()), months, step_up=step_up)
+
 final_values = {}
-for label, rate in risk_rates.items():
-    values = [
-        compound_growth(monthly_saving, rate, m)
-        for m in range(1, months + 1)
-    ]
+for (label, rate), values in zip(risk_rates.items(), curves):
     final_values[label] = values[-1]
 
     fig.add_trace(
@@ -40,7 +45,7 @@ for label, rate in risk_rates.items():
     )
 
 # Total invested line
-invested_values = [monthly_saving * m for m in range(1, months + 1)]
+invested_values = contribution_schedule(monthly_saving, months, step_up).cumsum()
 fig.add_trace(
     go.Scatter(
         x=list(range(1, months + 1)),
@@ -65,7 +70,7 @@ st.plotly_chart(fig, use_container_width=True)
 
 # ── Results Summary ──
 st.markdown("### 💡 Results Summary")
-total_invested = monthly_saving * months
+total_invested = invested_values[-1]
 cols = st.columns(len(risk_rates) + 1)
 
 cols[0].metric("💵 Total Invested", f"₹{total_invested:,.0f}")
@@ -78,5 +83,32 @@ for i, (label, value) in enumerate(final_values.items()):
         delta=f"+₹{returns:,.0f} returns"
     )
 
+st.divider()
+
+# ── Market Ups & Downs (Monte Carlo) ──
+st.markdown("### 🎲 Market Ups & Downs")
+if st.toggle("Simulate 10,000 possible market paths", value=False):
+    mc_fig = go.Figure()
+    mc_cols = st.columns(len(risk_rates))
+    for i, (label, rate) in enumerate(risk_rates.items()):
+        sim = simulate_paths(monthly_saving, rate, risk_volatility[rate], months,
+                             n_paths=10_000, seed=42, step_up=step_up)
+        name = label.split("(")[0].strip()
+        mc_fig.add_trace(go.Scatter(x=sim["months"], y=sim["p95"], mode='lines',
+                                    line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        mc_fig.add_trace(go.Scatter(x=sim["months"], y=sim["p5"], mode='lines', fill='tonexty',
+                                    line=dict(width=0), name=f"{name} (5–95% range)", opacity=0.3))
+        mc_fig.add_trace(go.Scatter(x=sim["months"], y=sim["p50"], mode='lines',
+                                    line=dict(width=3), name=f"{name} (median)"))
+        mc_cols[i].metric(name, f"₹{sim['p50'][-1]:,.0f}",
+                          delta=f"₹{sim['p5'][-1]:,.0f} – ₹{sim['p95'][-1]:,.0f}", delta_color="off")
+    mc_fig.update_layout(
+        xaxis_title="Months", yaxis_title="Value (₹)", height=450, template="plotly_dark",
+        margin=dict(l=20, r=20, t=30, b=20),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    st.plotly_chart(mc_fig, use_container_width=True)
+    st.caption("Shaded bands show where 90% of simulated outcomes landed; the line is the median.")
+
 st.divider()
 st.info("💡 **Tip**: Even ₹500/month in a SIP can grow significantly over 5+ years thanks to compound interest!")